@@ -0,0 +1,222 @@
+# backend/app_catalog.py
+#
+# SQLite index of the generated apps, so /list_apps is a single indexed
+# query instead of a directory scan. Builds and deletes update it directly;
+# a rescan of the apps folder picks up anything changed behind its back and
+# runs whenever the folder's own mtime moves (an app folder was added,
+# removed or renamed) or the last scan is older than rescan_seconds.
+
+import os
+import sqlite3
+import threading
+import time
+from pipeline.build import project_path
+
+# Columns /list_apps may sort by
+SORT_COLUMNS = ("created", "updated", "name", "size", "status", "language")
+
+# First match wins when guessing the language of an app found on disk
+_LANGUAGE_MARKERS = [
+    ("requirements.txt", "Python"), ("package.json", "JavaScript"), ("go.mod", "Go"),
+    ("Cargo.toml", "Rust"), ("pom.xml", "Java"), ("index.html", "HTML"),
+]
+_LANGUAGE_EXTENSIONS = {".py": "Python", ".js": "JavaScript", ".ts": "TypeScript", ".go": "Go",
+                        ".rs": "Rust", ".java": "Java", ".rb": "Ruby", ".html": "HTML"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS apps (
+    name TEXT PRIMARY KEY,
+    language TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    files INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'unknown',
+    last_build TEXT,
+    last_run_success INTEGER,
+    last_message TEXT,
+    build_seconds REAL,
+    tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS apps_created ON apps (created);
+CREATE INDEX IF NOT EXISTS apps_updated ON apps (updated);
+CREATE INDEX IF NOT EXISTS apps_status ON apps (status, created);
+CREATE INDEX IF NOT EXISTS apps_language ON apps (language, created);
+"""
+
+# Longest build message kept per app
+_MESSAGE_CHARS = 2000
+
+
+def folder_usage(folder: str):
+    """
+    Returns (total bytes, file count) of the regular files under folder.
+    """
+    size = files = 0
+    for root, dirs, names in os.walk(folder):
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        for name in names:
+            try:
+                st = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            size += st.st_size
+            files += 1
+    return size, files
+
+
+def guess_language(folder: str):
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return None
+    for marker, language in _LANGUAGE_MARKERS:
+        if marker in names:
+            return language
+    for name in names:
+        language = _LANGUAGE_EXTENSIONS.get(os.path.splitext(name)[1])
+        if language:
+            return language
+    return None
+
+
+class AppCatalog:
+    """
+    Catalog of the apps under root_dir, stored in an SQLite file at db_path.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, db_path: str, root_dir: str, rescan_seconds: float = 300):
+        self.root_dir = root_dir
+        self.rescan_seconds = rescan_seconds
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._scanned_at = 0.0
+        self._scanned_mtime = None
+
+    def _app_folders(self):
+        """
+        {name: full path} of every app folder currently on disk.
+        """
+        apps = {}
+        with os.scandir(self.root_dir) as entries:
+            for entry in entries:
+                try:
+                    folder = project_path(self.root_dir, entry.name)
+                except ValueError:
+                    continue  # hidden or one of the builder's own folders
+                if entry.is_dir(follow_symlinks=False):
+                    apps[entry.name] = folder
+        return apps
+
+    def needs_rescan(self) -> bool:
+        try:
+            mtime = os.stat(self.root_dir).st_mtime_ns
+        except OSError:
+            return False
+        return mtime != self._scanned_mtime or time.time() - self._scanned_at > self.rescan_seconds
+
+    def rescan(self):
+        """
+        Bring the catalog in line with the apps folder: add apps it does not
+        know yet, drop the ones whose folder is gone and re-measure the ones
+        whose folder changed since they were last recorded.
+        """
+        scanned_mtime = os.stat(self.root_dir).st_mtime_ns
+        on_disk = self._app_folders()
+        with self._lock:
+            known = {row["name"]: row["updated"] for row in self._db.execute("SELECT name, updated FROM apps")}
+        for name in set(known) - set(on_disk):
+            self.remove(name)
+        for name, folder in on_disk.items():
+            try:
+                st = os.stat(folder)
+            except OSError:
+                continue
+            if name in known and st.st_mtime <= known[name]:
+                continue
+            size, files = folder_usage(folder)
+            language = guess_language(folder)
+            with self._lock, self._db:
+                if name in known:
+                    # A built app keeps the language it was built in; only guessed ones are re-guessed
+                    self._db.execute(
+                        """
+                        UPDATE apps SET language = CASE WHEN last_build IS NULL THEN COALESCE(?, language)
+                                                        ELSE language END,
+                                        updated = ?, size = ?, files = ?
+                        WHERE name = ?
+                        """,
+                        (language, st.st_mtime, size, files, name))
+                else:
+                    self._db.execute(
+                        "INSERT OR IGNORE INTO apps (name, language, created, updated, size, files) VALUES (?, ?, ?, ?, ?, ?)",
+                        (name, language, st.st_ctime, st.st_mtime, size, files))
+        self._scanned_at = time.time()
+        self._scanned_mtime = scanned_mtime
+
+    def record_build(self, name: str, language: str, status: str, result: dict = None, build_id: str = None):
+        """
+        Store the outcome of a build of app name; the folder is re-measured.
+        """
+        try:
+            folder = project_path(self.root_dir, name)
+        except ValueError:
+            return
+        if not os.path.isdir(folder):
+            return  # the build never got as far as writing files
+        result = result or {}
+        stats = result.get("stats") or {}
+        size, files = folder_usage(folder)
+        now = time.time()
+        success = result.get("success")
+        with self._lock, self._db:
+            self._db.execute(
+                """
+                INSERT INTO apps (name, language, created, updated, size, files, status, last_build,
+                                  last_run_success, last_message, build_seconds, tokens)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET
+                    language = excluded.language, updated = excluded.updated, size = excluded.size,
+                    files = excluded.files, status = excluded.status, last_build = excluded.last_build,
+                    last_run_success = excluded.last_run_success, last_message = excluded.last_message,
+                    build_seconds = excluded.build_seconds, tokens = excluded.tokens
+                """,
+                (name, language, now, now, size, files, status, build_id,
+                 None if success is None else int(bool(success)), (result.get("message") or "")[-_MESSAGE_CHARS:],
+                 stats.get("seconds"), stats.get("prompt_tokens", 0) + stats.get("completion_tokens", 0)))
+
+    def remove(self, name: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM apps WHERE name = ?", (name,))
+
+    def query(self, offset: int = 0, limit: int = 100, sort: str = "created", descending: bool = True,
+              language: str = None, status: str = None, search: str = None):
+        """
+        Returns (total matching apps, one page of them as dicts).
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort!r}; choose one of {', '.join(SORT_COLUMNS)}")
+        where, params = [], []
+        if language:
+            where.append("language = ? COLLATE NOCASE")
+            params.append(language)
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if search:
+            where.append("name LIKE ? ESCAPE '\\'")
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        order = "DESC" if descending else "ASC"
+        with self._lock:
+            total = self._db.execute(f"SELECT COUNT(*) FROM apps {clause}", params).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT * FROM apps {clause} ORDER BY {sort} {order}, name LIMIT ? OFFSET ?",
+                params + [limit, offset]).fetchall()
+        return total, [dict(row) for row in rows]
@@ -0,0 +1,128 @@
+# backend/archive_cache.py
+#
+# Built zips of apps kept on disk, keyed by a hash of the app's manifest
+# (path, size, mtime and mode of every file). An unchanged app is served
+# from its cached zip after a single stat pass; any change to the app gives
+# a new key, and the archive for the old one is dropped when the new one is
+# stored or when a build finishes with the app.
+
+import hashlib
+import os
+import threading
+import uuid
+from backend.archive_stream import iter_archive
+
+
+def manifest_hash(entries: list) -> str:
+    """
+    Hash of archive_entries() output. Equal hashes mean byte-identical archives.
+    """
+    digest = hashlib.sha1()
+    for arcname, _, st in entries:
+        digest.update(f"{arcname}\0{st.st_size}\0{st.st_mtime_ns}\0{st.st_mode}\n".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+
+class ArchiveCache:
+    """
+    One cached zip per app, stored as "<app>--<manifest hash>.zip" in cache_dir.
+    The least recently downloaded archives are evicted beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path(self, app_name: str, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{app_name}--{digest}.zip")
+
+    def open_archive(self, app_name: str, digest: str):
+        """
+        The cached archive opened for reading, or None if it has not been
+        built yet (or was evicted). Reads through the returned file keep
+        working if the archive is evicted meanwhile.
+        """
+        path = self.path(app_name, digest)
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass  # evicted since it was opened; the open file is still whole
+        return f
+
+    def store(self, app_name: str, digest: str, app_folder: str, entries: list) -> str:
+        """
+        Build the archive into the cache and return its path.
+        """
+        for _ in self.stream_and_store(app_name, digest, app_folder, entries):
+            pass
+        return self.path(app_name, digest)
+
+    def stream_and_store(self, app_name: str, digest: str, app_folder: str, entries: list):
+        """
+        Yields the archive's chunks while also writing them to the cache.
+        Nothing is cached if the stream is not consumed to the end.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = os.path.join(self.cache_dir, f".{uuid.uuid4().hex}.tmp")
+        complete = False
+        try:
+            with open(temp_path, "wb") as f:
+                for chunk in iter_archive(app_folder, entries):
+                    f.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                self._commit(temp_path, app_name, digest)
+            else:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def evict(self, app_name: str, keep: str = None):
+        """
+        Drop cached archives of app_name, except the one for digest keep.
+        """
+        for name in self._archives():
+            cached_app, _, digest = name[:-len(".zip")].rpartition("--")
+            if cached_app == app_name and digest != keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def _archives(self) -> list:
+        try:
+            return [name for name in os.listdir(self.cache_dir) if name.endswith(".zip")]
+        except FileNotFoundError:
+            return []
+
+    def _commit(self, temp_path: str, app_name: str, digest: str):
+        with self._lock:
+            os.replace(temp_path, self.path(app_name, digest))
+            self.evict(app_name, keep=digest)
+            self._enforce_budget()
+
+    def _enforce_budget(self):
+        archives = []
+        for name in self._archives():
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            archives.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in archives)
+        for _, size, name in sorted(archives):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
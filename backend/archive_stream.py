@@ -0,0 +1,167 @@
+# backend/archive_stream.py
+#
+# Zip archives of an app folder produced on the fly, chunk by chunk, with
+# nothing written to disk. The archive is deterministic (sorted entries,
+# timestamps from file mtimes, fixed compression), so the same tree always
+# yields the same bytes and byte ranges can be served by regenerating it.
+
+import os
+import stat
+import time
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+_ZIP_EPOCH = 315532800  # 1980-01-01
+
+# Never shipped in a download
+_SKIP_DIRS = {"__pycache__", ".git", "node_modules"}
+
+
+class _ChunkSink:
+    """
+    Write-only, non-seekable file object that zipfile writes into.
+    Output is collected until drained, so at most one chunk of compressed
+    data (plus zip headers) is held in memory at a time.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def archive_entries(app_folder: str):
+    """
+    Files to archive as (archive name, full path, os.stat_result), in a stable order.
+    """
+    entries = []
+    for root, dirs, files in os.walk(app_folder):
+        dirs[:] = sorted(d for d in dirs if d not in _SKIP_DIRS)
+        for name in sorted(files):
+            full_path = os.path.join(root, name)
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                arcname = os.path.relpath(full_path, app_folder).replace(os.sep, "/")
+                entries.append((arcname, full_path, st))
+    return entries
+
+
+def _zip_info(arcname: str, st) -> zipfile.ZipInfo:
+    # Zip timestamps start in 1980; anything older is clamped
+    date_time = time.localtime(max(st.st_mtime, _ZIP_EPOCH))[:6]
+    info = zipfile.ZipInfo(arcname, date_time=date_time)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = (st.st_mode & 0xFFFF) << 16
+    info.file_size = st.st_size  # lets zipfile pick zip64 headers up front
+    return info
+
+
+def iter_archive(app_folder: str, entries: list = None, chunk_size: int = CHUNK_SIZE):
+    """
+    Yields the zip archive of app_folder as byte chunks.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        for arcname, full_path, st in entries if entries is not None else archive_entries(app_folder):
+            try:
+                source = open(full_path, "rb")
+            except OSError:
+                continue
+            with source, archive.open(_zip_info(arcname, st), "w") as target:
+                remaining = st.st_size  # stay consistent with the size recorded up front
+                while remaining > 0:
+                    data = source.read(min(chunk_size, remaining))
+                    if not data:
+                        break
+                    remaining -= len(data)
+                    target.write(data)
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+def archive_size(app_folder: str, entries: list = None) -> int:
+    """
+    Exact length of iter_archive()'s output, found by compressing without keeping anything.
+    """
+    return sum(len(chunk) for chunk in iter_archive(app_folder, entries))
+
+
+def iter_range(chunks, start: int, end: int):
+    """
+    The bytes [start, end) of a chunk stream.
+    """
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(start - position, 0):min(end, chunk_end) - position]
+        position = chunk_end
+        if position >= end:
+            return
+
+
+def iter_file(f, start: int = 0, end: int = None, chunk_size: int = CHUNK_SIZE):
+    """
+    The bytes [start, end) of an open file, in chunks. Closes the file when done.
+    """
+    try:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def parse_range(header: str, total: int):
+    """
+    Parses a single-range `Range: bytes=...` header.
+    Returns (start, end) inclusive, or None if it cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if first == "":
+            length = int(last)
+            if length <= 0:
+                return None
+            return max(total - length, 0), total - 1
+        start = int(first)
+        end = int(last) if last else total - 1
+    except ValueError:
+        return None
+    if start >= total or end < start:
+        return None
+    return start, min(end, total - 1)
@@ -0,0 +1,291 @@
+# backend/build_queue.py
+#
+# Job queue in front of the builder: a fixed pool of workers runs builds in
+# arrival order, everyone else waits in line and is told their position.
+# Builds run in this process through pipeline.build; expensive stages inside
+# each build are further limited by pipeline.stage_limits.
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from config import BUILD_EVENT_HISTORY
+from pipeline.build import build_events
+
+# Token deltas are merged into one stored event until it reaches this many
+# characters or has been open this long
+_TOKEN_FLUSH_CHARS = 512
+_TOKEN_FLUSH_SECONDS = 0.2
+
+
+class QueueFull(Exception):
+    pass
+
+
+class BuildJob:
+    """
+    One requested build and its recent events.
+    Besides the pipeline's events (see pipeline.events) the queue adds
+    {"type": "queue", "position": n} while the build waits.
+
+    Runs of token deltas are stored as one event, only the last
+    `history` events are kept, and once the build is done and nobody is
+    following it only the final result event is kept. Events are numbered
+    from 0 over the whole build; a follower that asks for events no longer
+    kept gets a "summary" event in their place.
+    """
+
+    def __init__(self, idea: str, stream: bool, project_name: str, language: str,
+                 history: int = BUILD_EVENT_HISTORY):
+        self.id = uuid.uuid4().hex[:12]
+        self.idea = idea
+        self.stream = stream
+        self.project_name = project_name
+        self.language = language
+        self.status = "queued"  # queued -> running -> finished / failed / cancelled
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.events = deque(maxlen=history)
+        self.event_count = 0  # events stored over the build's lifetime, including dropped ones
+        self.result = None
+        self.cancel_event = threading.Event()
+        self.announced_position = 0
+        self._changed = asyncio.Condition()
+        self._followers = 0
+        self._tokens = []
+        self._tokens_started = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("finished", "failed", "cancelled")
+
+    @property
+    def first_index(self) -> int:
+        """
+        Index of the oldest event still kept.
+        """
+        return self.event_count - len(self.events)
+
+    def _store(self, event: dict):
+        self.events.append(event)
+        self.event_count += 1
+
+    def _flush_tokens(self):
+        if self._tokens:
+            self._store({"type": "token", "text": "".join(self._tokens)})
+            self._tokens = []
+
+    async def emit(self, event: dict):
+        async with self._changed:
+            if event["type"] == "token":
+                if not self._tokens:
+                    self._tokens_started = time.monotonic()
+                self._tokens.append(event["text"])
+                if (sum(len(t) for t in self._tokens) < _TOKEN_FLUSH_CHARS
+                        and time.monotonic() - self._tokens_started < _TOKEN_FLUSH_SECONDS):
+                    return
+                self._flush_tokens()
+            else:
+                self._flush_tokens()
+                self._store(event)
+            self._changed.notify_all()
+
+    async def log(self, text: str):
+        await self.emit({"type": "log", "text": text})
+
+    async def finish(self, status: str):
+        async with self._changed:
+            self._flush_tokens()
+            self.status = status
+            self.finished = time.time()
+            self._drop_history()
+            self._changed.notify_all()
+
+    def _drop_history(self):
+        # Nothing can resume a finished build nobody follows, except to learn the outcome
+        if self.done and not self._followers:
+            last = self.events[-1] if self.events and self.events[-1]["type"] == "result" else None
+            self.events.clear()
+            if last is not None:
+                self.events.append(last)
+
+    async def follow(self, start: int = 0):
+        """
+        Yields (index, event) for every kept event from index start on, then
+        new ones as they arrive, until the build is done. Each follower reads
+        at its own pace from the job's history, so a slow client never holds
+        up the build or other clients. Events that were already dropped are
+        replaced by one "summary" event.
+        """
+        index = start
+        self._followers += 1
+        try:
+            while True:
+                summary = None
+                async with self._changed:
+                    while index >= self.event_count and not self.done:
+                        await self._changed.wait()
+                    if index < self.first_index:
+                        summary = dict(self.summary(), type="summary", skipped=self.first_index - index)
+                        index = self.first_index
+                    new_events = list(self.events)[index - self.first_index:]
+                    finished = self.done
+                if summary is not None:
+                    yield index - 1, summary
+                for event in new_events:
+                    yield index, event
+                    index += 1
+                if finished and index >= self.event_count:
+                    return
+        finally:
+            self._followers -= 1
+            self._drop_history()
+
+    async def follow_text(self):
+        """
+        The build's console output as plain text, as printed by the CLI.
+        """
+        async for _, event in self.follow():
+            if event["type"] in ("log", "token"):
+                yield event["text"]
+            elif event["type"] == "queue":
+                yield f"⏳ Queue position: {event['position']}.\n"
+            elif event["type"] == "summary":
+                yield f"ℹ️ {event['skipped']} earlier event(s) are no longer available.\n"
+
+    def summary(self, position: int = 0) -> dict:
+        return {
+            "id": self.id,
+            "project_name": self.project_name,
+            "language": self.language,
+            "status": self.status,
+            "position": position,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "success": (self.result or {}).get("success"),
+            "stats": (self.result or {}).get("stats"),
+        }
+
+
+class BuildQueue:
+    """
+    FIFO of builds served by `workers` concurrent workers. Projects are
+    created under root_dir. Cancelling a running build stops it at its
+    next checkpoint. on_finished(job) is called on a worker thread after
+    every build that ran.
+    """
+
+    def __init__(self, root_dir: str, workers: int, max_pending: int, history: int = 100, on_finished=None):
+        self.root_dir = root_dir
+        self.on_finished = on_finished
+        self.workers = workers
+        self.max_pending = max_pending
+        self.history = history
+        self.jobs = OrderedDict()
+        self._pending = deque()
+        self._wakeup = None
+        self._tasks = []
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="build")
+
+    def _ensure_workers(self):
+        # Started lazily so the queue binds to the server's running event loop
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    def position(self, job: BuildJob) -> int:
+        """
+        1-based place in line, or 0 if the job is not waiting.
+        """
+        try:
+            return self._pending.index(job) + 1
+        except ValueError:
+            return 0
+
+    async def submit(self, idea: str, stream: bool, project_name: str, language: str) -> BuildJob:
+        self._ensure_workers()
+        if len(self._pending) >= self.max_pending:
+            raise QueueFull(f"{len(self._pending)} builds are already waiting")
+        job = BuildJob(idea, stream, project_name, language)
+        self.jobs[job.id] = job
+        self._pending.append(job)
+        self._forget_old_jobs()
+        running = sum(1 for j in self.jobs.values() if j.status in ("running", "cancelling"))
+        if running >= self.workers:
+            job.announced_position = self.position(job)
+            await job.emit({"type": "queue", "position": job.announced_position})
+        self._wakeup.set()
+        return job
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a waiting or running build. Returns False if it is unknown or already finished.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        if job.status == "queued":
+            self._pending.remove(job)
+            await job.log("🛑 Build cancelled before it started.\n")
+            await job.finish("cancelled")
+            await self._announce_positions()
+            return True
+        job.status = "cancelling"
+        job.cancel_event.set()
+        return True
+
+    def list(self) -> list:
+        return [job.summary(self.position(job)) for job in self.jobs.values()]
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(len(finished) - self.history, 0)]:
+            del self.jobs[job_id]
+
+    async def _announce_positions(self):
+        for index, job in enumerate(list(self._pending)):
+            if job.announced_position != index + 1:
+                job.announced_position = index + 1
+                await job.emit({"type": "queue", "position": index + 1})
+
+    async def _worker(self):
+        while True:
+            while not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            job = self._pending.popleft()
+            job.status = "running"
+            await self._announce_positions()
+            try:
+                await self._run(job)
+            except Exception as e:
+                await job.log(f"❌ Build crashed: {e}\n")
+                await job.finish("failed")
+            if self.on_finished is not None:
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self.on_finished, job)
+                except Exception as e:
+                    print(f"⚠️ Post-build hook failed for {job.project_name}: {e}")
+
+    async def _run(self, job: BuildJob):
+        job.started = time.time()
+        waited = job.started - job.created
+        if waited >= 1:
+            await job.log(f"🚀 Build started after {waited:.0f}s in queue.\n")
+
+        events = build_events(job.idea, job.language, job.project_name, job.stream, self.root_dir,
+                              cancel=job.cancel_event, executor=self._executor)
+        async for event in events:
+            if event["type"] == "result":
+                job.result = event
+            await job.emit(event)
+
+        if job.result is None or job.result.get("cancelled"):
+            await job.finish("cancelled")
+        else:
+            await job.finish("finished" if job.result.get("success") else "failed")
@@ -0,0 +1,123 @@
+# backend/fs_ops.py
+#
+# Filesystem work of the backend's endpoints (archiving, deleting, catalog
+# scans) runs on its own bounded thread pool, so a big delete or zip never
+# blocks the event loop and never competes with the build workers for threads.
+# Deleting an app is a rename into a trash folder; the actual removal
+# happens later in the background.
+
+import asyncio
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import FS_WORKERS, TRASH_DIR
+
+_executor = ThreadPoolExecutor(max_workers=FS_WORKERS, thread_name_prefix="fs")
+_stopping = threading.Event()
+_reaping = threading.Lock()
+
+
+async def run_io(fn, *args):
+    """
+    Await fn(*args) on the filesystem pool. If the caller is cancelled
+    before fn has started, it never runs.
+    """
+    future = _executor.submit(fn, *args)
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+
+
+_DONE = object()
+
+
+def _submit(fn, *args):
+    try:
+        return _executor.submit(fn, *args)
+    except RuntimeError:  # pool already shut down
+        fn(*args)
+
+
+async def iterate_io(iterator):
+    """
+    Async iteration over a blocking iterator, each step taken on the
+    filesystem pool. Closing this generator (e.g. when the client of a
+    streaming response goes away) closes the iterator, stopping its work.
+    """
+    step = None
+    try:
+        while True:
+            step = _executor.submit(next, iterator, _DONE)
+            item = await asyncio.wrap_future(step)
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            # A generator cannot be closed while a step is still running in it
+            if step is None or step.done():
+                _submit(close)
+            else:
+                step.add_done_callback(lambda _: _submit(close))
+
+
+def move_to_trash(path: str) -> bool:
+    """
+    Move path into the trash folder so its name is free at once.
+    Returns False if it could not be renamed (e.g. another filesystem),
+    in which case it is removed in place.
+    """
+    os.makedirs(TRASH_DIR, exist_ok=True)
+    try:
+        os.rename(path, os.path.join(TRASH_DIR, f"{os.path.basename(path)}-{uuid.uuid4().hex[:8]}"))
+        return True
+    except OSError:
+        shutil.rmtree(path, ignore_errors=True)
+        return False
+
+
+def reap_trash():
+    """
+    Remove everything in the trash folder, one entry at a time, stopping early on shutdown.
+    """
+    if not _reaping.acquire(blocking=False):
+        return  # another reaper is already at it
+    try:
+        try:
+            names = os.listdir(TRASH_DIR)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if _stopping.is_set():
+                return
+            path = os.path.join(TRASH_DIR, name)
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    finally:
+        _reaping.release()
+
+
+def schedule_reap():
+    """
+    Empty the trash in the background.
+    """
+    if not _stopping.is_set():
+        _submit(reap_trash)
+
+
+def shutdown():
+    """
+    Stop background reaping and let queued filesystem work lapse.
+    """
+    _stopping.set()
+    _executor.shutdown(wait=False)
@@ -2,18 +2,37 @@
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
-import subprocess
 import os
-import asyncio
-import shutil
-import glob
-import zipfile
+import sys
 import datetime
+import json
+from contextlib import asynccontextmanager
 
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
 
-app = FastAPI()
+from config import (BUILD_WORKERS, BUILD_QUEUE_MAX, BUILD_HISTORY, USE_ARCHIVE_CACHE, ARCHIVE_CACHE_DIR,
+                    ARCHIVE_CACHE_MAX_BYTES, APP_CATALOG_PATH, APP_CATALOG_RESCAN_SECONDS)
+from backend.app_catalog import AppCatalog
+from backend.archive_cache import ArchiveCache, manifest_hash
+from backend.archive_stream import archive_entries, archive_size, iter_archive, iter_file, iter_range, parse_range
+from backend.build_queue import BuildQueue, QueueFull
+from backend.fs_ops import iterate_io, move_to_trash, run_io, schedule_reap, shutdown as shutdown_fs_ops
+from pipeline.build import project_path
+from tester.fork_server import stop_all as stop_fork_servers
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    schedule_reap()  # leftovers from deletes interrupted by a restart
+    yield
+    shutdown_fs_ops()
+    stop_fork_servers()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,93 +46,208 @@ class BuildRequest(BaseModel):
     idea: str
     stream: bool
 
+archive_cache = ArchiveCache(ARCHIVE_CACHE_DIR, ARCHIVE_CACHE_MAX_BYTES)
+app_catalog = AppCatalog(APP_CATALOG_PATH, ROOT_DIR, APP_CATALOG_RESCAN_SECONDS)
+
+
+def _build_finished(job):
+    # A build rewrites its app, so any archive made of it mid-build is stale
+    archive_cache.evict(job.project_name)
+    app_catalog.record_build(job.project_name, job.language, job.status, job.result, job.id)
 
-@app.get("/list_apps")
-async def list_apps():
-    base_folder = os.path.join(os.getcwd(), "../")
-    apps = []
 
-    for entry in os.listdir(base_folder):
-        full_path = os.path.join(base_folder, entry)
-        if (
-            os.path.isdir(full_path)
-            and not entry.startswith(".")
-            and entry not in ["backend", "env", "node_modules", "__pycache__"]
-            and os.path.isfile(os.path.join(full_path, "requirements.txt"))
-        ):
-            # Get creation time
-            created_ts = os.path.getctime(full_path)
-            created_time = datetime.datetime.fromtimestamp(created_ts).strftime("%Y-%m-%d %H:%M:%S")
-            apps.append({"name": entry, "created": created_time})
+build_queue = BuildQueue(ROOT_DIR, BUILD_WORKERS, BUILD_QUEUE_MAX, BUILD_HISTORY, on_finished=_build_finished)
 
-    return {"apps": sorted(apps, key=lambda x: x["created"], reverse=True)}
 
+@app.get("/list_apps")
+async def list_apps(offset: int = 0, limit: int = 100, sort: str = "created", order: str = "desc",
+                    language: str = None, status: str = None, q: str = None):
+    offset, limit = max(offset, 0), min(max(limit, 1), 1000)
+    if app_catalog.needs_rescan():
+        await run_io(app_catalog.rescan)
+    try:
+        total, rows = await run_io(app_catalog.query, offset, limit, sort, order.lower() != "asc", language, status, q)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    apps = []
+    for row in rows:
+        row["created"] = datetime.datetime.fromtimestamp(row["created"]).strftime("%Y-%m-%d %H:%M:%S")
+        row["updated"] = datetime.datetime.fromtimestamp(row["updated"]).strftime("%Y-%m-%d %H:%M:%S")
+        apps.append(row)
+    return {"apps": apps, "total": total, "offset": offset, "limit": limit}
 
 
 @app.delete("/delete_app/{app_name}")
 async def delete_app(app_name: str):
-    base_folder = os.path.join(os.getcwd(), "../")
-    target_path = os.path.join(base_folder, app_name)
+    try:
+        target_path = project_path(ROOT_DIR, app_name)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="App not found")
 
-    if not os.path.isdir(target_path):
+    if not await run_io(os.path.isdir, target_path):
         raise HTTPException(status_code=404, detail="App not found")
 
-    shutil.rmtree(target_path)  # Delete entire app folder
+    # Renamed out of the way now, removed from disk in the background
+    await run_io(move_to_trash, target_path)
+    schedule_reap()
+    await run_io(archive_cache.evict, app_name)
+    await run_io(app_catalog.remove, app_name)
 
     return {"success": True}
 
 
-@app.get("/download_app/{app_name}")
-async def download_app(app_name: str):
-    base_folder = os.path.join(os.getcwd(), "../")
-    app_folder = os.path.join(base_folder, app_name)
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
 
-    if not os.path.isdir(app_folder):
-        raise HTTPException(status_code=404, detail="App not found")
 
-    zip_path = os.path.join(base_folder, f"{app_name}.zip")
+def _byte_range(range_header: str, total: int, headers: dict):
+    """
+    The (start, end) requested by a Range header, with the partial-content
+    headers added, or None if it cannot be satisfied.
+    """
+    requested = parse_range(range_header, total)
+    if requested is not None:
+        start, end = requested
+        headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+        headers["Content-Length"] = str(end - start + 1)
+    return requested
 
-    # Create a zip of the app
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(app_folder):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, app_folder)
-                zipf.write(file_path, arcname)
 
-    return FileResponse(zip_path, filename=f"{app_name}.zip", media_type="application/zip")
+@app.get("/download_app/{app_name}")
+async def download_app(app_name: str, request: Request):
+    try:
+        app_folder = project_path(ROOT_DIR, app_name)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="App not found")
 
+    if not await run_io(os.path.isdir, app_folder):
+        raise HTTPException(status_code=404, detail="App not found")
 
-@app.post("/generate_app/stream")
-async def generate_app_stream(request: Request):
+    # One stat pass: the file listing decides both the ETag and the cached archive
+    entries = await run_io(archive_entries, app_folder)
+    digest = manifest_hash(entries)
+    etag = f'"{digest}"'
+    headers = {"Content-Disposition": f'attachment; filename="{app_name}.zip"', "Accept-Ranges": "bytes",
+               "ETag": etag}
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None  # the client's partial copy is of another version
+
+    if USE_ARCHIVE_CACHE:
+        cached = await run_io(archive_cache.open_archive, app_name, digest)
+        if cached is None and range_header:
+            await run_io(archive_cache.store, app_name, digest, app_folder, entries)
+            cached = await run_io(archive_cache.open_archive, app_name, digest)
+        if cached is not None:
+            # Served through the open file, so evicting the archive meanwhile cannot break the download
+            total = os.fstat(cached.fileno()).st_size
+            if not range_header:
+                headers["Content-Length"] = str(total)
+                return StreamingResponse(iterate_io(iter_file(cached)), media_type="application/zip", headers=headers)
+            requested = _byte_range(range_header, total, headers)
+            if requested is None:
+                cached.close()
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{total}"})
+            start, end = requested
+            return StreamingResponse(iterate_io(iter_file(cached, start, end + 1)), status_code=206,
+                                     media_type="application/zip", headers=headers)
+        if not range_header:
+            # First download: stream it and keep a copy for the next one
+            return StreamingResponse(iterate_io(archive_cache.stream_and_store(app_name, digest, app_folder, entries)),
+                                     media_type="application/zip", headers=headers)
+        # Evicted again as soon as it was stored (e.g. larger than the whole cache): build the range below
+
+    # The zip is compressed chunk by chunk straight into the response
+    if not range_header:
+        return StreamingResponse(iterate_io(iter_archive(app_folder, entries)), media_type="application/zip",
+                                 headers=headers)
+
+    # Resumed download: the archive is deterministic, so regenerate it and skip to the range
+    total = await run_io(archive_size, app_folder, entries)
+    requested = _byte_range(range_header, total, headers)
+    if requested is None:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{total}"})
+    start, end = requested
+    return StreamingResponse(iterate_io(iter_range(iter_archive(app_folder, entries), start, end + 1)),
+                             status_code=206, media_type="application/zip", headers=headers)
+
+
+async def _submit_build(request: Request):
     form = await request.json()
     idea = form.get("idea")
-    stream = form.get("stream")
+    stream = str(form.get("stream")).lower() in ['y', 'yes', 'true', '1']
     project_name = form.get("projectName", "VibeApp")  # default fallback
+    language = form.get("language", "Python")
+
+    try:
+        project_path(ROOT_DIR, project_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     print(f"🛠️ Received idea: {idea}, Stream: {stream}")
 
-    async def run_builder():
-        process = await asyncio.create_subprocess_exec(
-            "python", "main.py", idea, str(stream), project_name,
-            cwd=os.path.join(os.getcwd(), "../"),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT,
-        )
+    try:
+        return await build_queue.submit(idea, stream, project_name, language)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Build queue is full: {e}")
 
-        while True:
-            line = await process.stdout.readline()
-            if not line:
-                break
-            decoded_line = line.decode()
 
-            # FILTER OUT LibreSSL warnings
-            if "NotOpenSSLWarning" in decoded_line:
-                continue
+async def _sse(events):
+    """
+    Server-sent events: the event index is the SSE id, so a client can
+    resume with Last-Event-ID.
+    """
+    async for index, event in events:
+        yield f"id: {index}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+@app.post("/generate_app/stream")
+async def generate_app_stream(request: Request):
+    job = await _submit_build(request)
+    return StreamingResponse(job.follow_text(), media_type="text/plain", headers={"X-Build-Id": job.id})
 
-            yield decoded_line
 
-        await process.wait()
+@app.post("/generate_app/events")
+async def generate_app_events(request: Request):
+    job = await _submit_build(request)
+    return StreamingResponse(_sse(job.follow()), media_type="text/event-stream",
+                             headers={"X-Build-Id": job.id, "Cache-Control": "no-cache"})
 
 
-    return StreamingResponse(run_builder(), media_type="text/plain")
+@app.get("/builds")
+async def list_builds():
+    return {"builds": build_queue.list()}
+
+
+@app.get("/builds/{build_id}")
+async def get_build(build_id: str):
+    job = build_queue.jobs.get(build_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Build not found")
+    return job.summary(build_queue.position(job))
+
+
+@app.get("/builds/{build_id}/events")
+async def build_events_stream(build_id: str, request: Request):
+    job = build_queue.jobs.get(build_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Build not found")
+    last_event_id = request.headers.get("last-event-id")
+    start = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+    return StreamingResponse(_sse(job.follow(start)), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/builds/{build_id}/cancel")
+async def cancel_build(build_id: str):
+    if not await build_queue.cancel(build_id):
+        raise HTTPException(status_code=404, detail="Build not found or already finished")
+    return {"success": True}
@@ -1,5 +1,7 @@
 # config.py
 
+import os
+
 # --- AI ENGINE SETTINGS ---
 
 # Engine options: "ollama", "gemini", "chatgpt"
@@ -15,3 +17,142 @@ GEMINI_API_KEY = "your-gemini-api-key-here"
 # Model/Key settings for ChatGPT (OpenAI)
 OPENAI_API_KEY = "your-openai-api-key-here"
 OPENAI_MODEL = "gpt-4"  # or "gpt-3.5-turbo"
+
+# --- OLLAMA CONNECTION POOL ---
+
+# Number of distinct hosts to keep connection pools for
+OLLAMA_POOL_CONNECTIONS = 4
+# Maximum keep-alive connections held open per host
+OLLAMA_POOL_MAXSIZE = 16
+# Block callers when all per-host connections are busy instead of opening extra ones
+OLLAMA_POOL_BLOCK = True
+# (connect, read) timeout in seconds for Ollama requests
+OLLAMA_TIMEOUT = (5, 600)
+
+# --- RESPONSE CACHE ---
+
+# Directory for the persistent tier of the LLM response cache
+RESPONSE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "responses")
+# Number of responses kept in the in-memory LRU tier
+RESPONSE_CACHE_MEMORY_ITEMS = 256
+# Disk budget for cached responses in bytes (oldest entries are evicted first)
+RESPONSE_CACHE_DISK_BYTES = 64 * 1024 * 1024
+# Seconds before a cached response expires (None = never)
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+
+# --- DEPENDENCY INSTALLATION ---
+
+# Start installing requirements.txt as soon as it is streamed, while other files are still generating
+EARLY_INSTALL = True
+# Background threads available for dependency installation
+INSTALL_WORKERS = 2
+
+# Add packages imported by the generated code but missing from requirements.txt
+INFER_REQUIREMENTS = True
+# Install each requirement set into a cached virtualenv instead of the host interpreter
+USE_VENV_POOL = True
+# Where pooled virtualenvs live, keyed by a hash of their requirement set
+VENV_POOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "venvs")
+# Disk budget for pooled virtualenvs in bytes (least recently used are evicted first)
+VENV_POOL_MAX_BYTES = 5 * 1024 * 1024 * 1024
+
+# Keep resolved packages as wheels in a local wheelhouse and install from it without an index
+USE_WHEELHOUSE = True
+WHEELHOUSE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "wheelhouse")
+# Never contact a package index; only wheels already in the wheelhouse can be installed
+OFFLINE_INSTALL = False
+# Packages warmed by `python -m tester.wheelhouse prefetch`
+POPULAR_PACKAGES = [
+    "flask", "requests", "numpy", "pandas", "fastapi", "uvicorn", "pydantic",
+    "jinja2", "sqlalchemy", "beautifulsoup4", "matplotlib", "pillow", "python-dotenv",
+]
+
+# --- APP RUNNER ---
+
+# Run generated Python apps as forks of a warm interpreter instead of fresh processes
+USE_FORK_SERVER = True
+# Modules pre-imported by each warm interpreter (missing ones are ignored)
+FORK_SERVER_WARM_MODULES = ["flask", "requests", "numpy", "pandas"]
+# Warm interpreters kept running at once (one per environment); the least recently used idle one is stopped
+FORK_SERVER_MAX = 4
+# Seconds before a run command is killed
+RUN_TIMEOUT = 60
+
+# --- BEST-OF-N GENERATION ---
+
+# Number of candidate projects generated and tested in parallel (1 = single candidate)
+BEST_OF_N = 1
+# Sampling temperature for each candidate, cycled when BEST_OF_N is larger
+BEST_OF_N_TEMPERATURES = [0.2, 0.5, 0.8, 1.0]
+
+# --- AUTO-FIX ---
+
+# Budget for one auto-fix session (None = unlimited)
+FIX_MAX_ITERATIONS = 5
+FIX_MAX_SECONDS = 600
+FIX_MAX_TOKENS = 60000
+# Fix candidates requested and tested in parallel per iteration (1 = one fix at a time)
+FIX_CANDIDATES = 1
+# Sampling temperature for each fix candidate, cycled when FIX_CANDIDATES is larger
+FIX_CANDIDATE_TEMPERATURES = [0.1, 0.4, 0.7, 1.0]
+# Approximate token budget for the code sent in a fix prompt; larger files are cut to the traceback's context
+FIX_PROMPT_TOKEN_BUDGET = 1500
+
+# --- FIX MEMORY ---
+
+# Reuse fixes that worked before for the same error before asking the model
+USE_FIX_MEMORY = True
+# Compacted store of remembered fixes; recent changes go to a journal next to it
+FIX_MEMORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge", "knowledge_base.json")
+# Maximum remembered fixes (the least successful are dropped first)
+FIX_MEMORY_MAX_ENTRIES = 1000
+# Journal records written before they are folded into the store
+FIX_MEMORY_COMPACT_AFTER = 100
+# Remembered fixes for similar errors shown to the model as worked examples (0 = none)
+FIX_FEW_SHOT_EXAMPLES = 2
+# Minimum estimated similarity (0-1) of the error and failing code for an example to be shown
+FIX_FEW_SHOT_MIN_SIMILARITY = 0.25
+
+# --- BUILD QUEUE ---
+
+# Builds run at the same time by the backend; further requests wait in line
+BUILD_WORKERS = 2
+# Builds allowed to wait in line before new requests are refused
+BUILD_QUEUE_MAX = 20
+# Finished builds kept for status queries
+BUILD_HISTORY = 100
+# Events a build may produce ahead of a slow consumer before it has to wait
+BUILD_EVENT_BUFFER = 256
+# Events kept per build for followers and resumes (token deltas are merged first); older ones are dropped
+BUILD_EVENT_HISTORY = 2000
+# Concurrent slots per pipeline stage, shared by every build on this machine (missing/0 = unlimited).
+# A slot is held for a whole model request, so "llm" must leave room for the BEST_OF_N and
+# FIX_CANDIDATES requests each build sends in parallel; with fewer slots those requests queue
+# up behind each other and raising either setting buys nothing. Match Ollama's OLLAMA_NUM_PARALLEL
+# to this value so the server actually runs them side by side.
+STAGE_LIMITS = {"llm": max(BEST_OF_N, FIX_CANDIDATES) * BUILD_WORKERS, "install": 2, "run": 4}
+# Lock files backing the stage slots
+STAGE_SLOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "slots")
+
+# --- APP DOWNLOADS ---
+
+# Keep the zip of each downloaded app and serve it again while the app is unchanged
+USE_ARCHIVE_CACHE = True
+# Where cached app archives live, keyed by a hash of the app's file listing
+ARCHIVE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "archives")
+# Disk budget for cached archives in bytes (least recently downloaded are evicted first)
+ARCHIVE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# --- APP CATALOG ---
+
+# SQLite index of generated apps behind /list_apps
+APP_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "apps.sqlite3")
+# Seconds between full rescans of the apps folder (it is also rescanned whenever an app folder appears or disappears)
+APP_CATALOG_RESCAN_SECONDS = 300
+
+# --- BACKEND FILE OPERATIONS ---
+
+# Threads for the backend's filesystem work (archives, deletes, catalog scans), separate from build workers
+FS_WORKERS = 4
+# Deleted apps are renamed into this folder and removed in the background (must be on the apps' filesystem)
+TRASH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".trash")
@@ -1,39 +1,254 @@
 # engines/ollama_engine.py
 
+import asyncio
+import json
+import threading
 import requests
-from config import OLLAMA_MODEL, OLLAMA_BASE_URL
+from requests.adapters import HTTPAdapter
+from config import (
+    OLLAMA_MODEL,
+    OLLAMA_BASE_URL,
+    OLLAMA_POOL_CONNECTIONS,
+    OLLAMA_POOL_MAXSIZE,
+    OLLAMA_POOL_BLOCK,
+    OLLAMA_TIMEOUT,
+)
+from engines.response_cache import get_cache, make_key, is_deterministic
+from pipeline.events import add_tokens
+from pipeline.stage_limits import stage_slot, async_stage_slot
 
-def generate_response(prompt: str, stream: bool = False) -> str:
-    endpoint = f"{OLLAMA_BASE_URL}/api/chat"
+_session = None
+_session_lock = threading.Lock()
+
+# One async client per event loop; httpx clients cannot be shared across loops.
+_async_clients = {}
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the shared pooled HTTP session used for every Ollama call.
+    Connections are kept alive and reused across generations, fix prompts
+    and fake-input requests instead of paying a new handshake per call.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=OLLAMA_POOL_CONNECTIONS,
+                    pool_maxsize=OLLAMA_POOL_MAXSIZE,
+                    pool_block=OLLAMA_POOL_BLOCK,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def close_session():
+    """
+    Closes the shared session and drops its pooled connections.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_async_client():
+    """
+    Returns the pooled httpx.AsyncClient bound to the running event loop.
+    """
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        connect_timeout, read_timeout = OLLAMA_TIMEOUT
+        client = httpx.AsyncClient(
+            base_url=OLLAMA_BASE_URL,
+            limits=httpx.Limits(
+                max_connections=OLLAMA_POOL_MAXSIZE,
+                max_keepalive_connections=OLLAMA_POOL_MAXSIZE,
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_async_client():
+    """
+    Closes the async client of the running event loop, e.g. on server shutdown.
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _build_payload(prompt: str, stream: bool, options: dict = None) -> dict:
     payload = {
         "model": OLLAMA_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "stream": stream
     }
-    try:
-        response = requests.post(endpoint, json=payload, stream=stream)
+    if options:
+        payload["options"] = options
+    return payload
+
+
+def _cache_key(prompt: str, options: dict, cache: bool):
+    """
+    Returns the response cache key, or None when caching is off for this call.
+    By default only deterministic (temperature 0) requests are cached.
+    """
+    if cache is None:
+        cache = is_deterministic(options)
+    return make_key(OLLAMA_MODEL, prompt, options) if cache else None
+
+
+def _parse_stream_line(line_data: str, usage: dict = None) -> str:
+    """
+    Extracts the content delta from one line of an Ollama chat stream.
+    """
+    if line_data.startswith('data: '):
+        line_data = line_data[6:]
+    content_piece = json.loads(line_data)
+    _record_usage(usage, content_piece)
+    return content_piece.get('message', {}).get('content', '')
+
+
+def _record_usage(usage: dict, result: dict):
+    """
+    Adds the token counts Ollama reports on a final message to usage and
+    to the current build's totals.
+    """
+    if not result.get("done"):
+        return
+    prompt_tokens, completion_tokens = result.get("prompt_eval_count", 0), result.get("eval_count", 0)
+    add_tokens(prompt_tokens, completion_tokens)
+    if usage is None:
+        return
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + prompt_tokens
+    usage["completion_tokens"] = usage.get("completion_tokens", 0) + completion_tokens
+
+
+def stream_response(prompt: str, options: dict = None, cache: bool = None, usage: dict = None):
+    """
+    Yields content deltas from Ollama as they are generated.
+    A cached response is replayed as a single delta.
+    Token counts are added to usage, if given.
+    """
+    key = _cache_key(prompt, options, cache)
+    if key:
+        cached = get_cache().get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    endpoint = f"{OLLAMA_BASE_URL}/api/chat"
+    payload = _build_payload(prompt, stream=True, options=options)
+    pieces = []
+    with stage_slot("llm"), get_session().post(endpoint, json=payload, stream=True, timeout=OLLAMA_TIMEOUT) as response:
         response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                delta = _parse_stream_line(line.decode('utf-8'), usage)
+                pieces.append(delta)
+                yield delta
+
+    if key:
+        get_cache().put(key, "".join(pieces))
+
 
+def generate_response(prompt: str, stream: bool = False, options: dict = None, cache: bool = None, usage: dict = None) -> str:
+    endpoint = f"{OLLAMA_BASE_URL}/api/chat"
+    try:
         if stream:
             # Streaming response
             full_text = ""
-            for line in response.iter_lines():
-                if line:
-                    line_data = line.decode('utf-8')
-                    if line_data.startswith('data: '):
-                        line_data = line_data[6:]
-                    import json
-                    content_piece = json.loads(line_data)
-                    delta = content_piece.get('message', {}).get('content', '')
-                    print(delta, end="", flush=True)  # typing effect
-                    full_text += delta
+            for delta in stream_response(prompt, options=options, cache=cache, usage=usage):
+                print(delta, end="", flush=True)  # typing effect
+                full_text += delta
             print("\n")  # After stream ends
             return full_text
         else:
             # Normal full response
-            result = response.json()
-            return result.get("message", {}).get("content", "")
+            key = _cache_key(prompt, options, cache)
+            if key:
+                cached = get_cache().get(key)
+                if cached is not None:
+                    return cached
+
+            payload = _build_payload(prompt, stream=False, options=options)
+            with stage_slot("llm"), get_session().post(endpoint, json=payload, timeout=OLLAMA_TIMEOUT) as response:
+                response.raise_for_status()
+                result = response.json()
+            _record_usage(usage, result)
+            content = result.get("message", {}).get("content", "")
+            if key:
+                get_cache().put(key, content)
+            return content
+
+    except Exception as e:
+        print(f"Error communicating with Ollama: {e}")
+        return ""
+
 
+async def _in_thread(fn, *args):
+    # Cache lookups and stores touch the disk; keep them off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+async def astream_response(prompt: str, options: dict = None, cache: bool = None, usage: dict = None):
+    """
+    Async iterator over content deltas, for callers running on an event loop.
+    """
+    key = _cache_key(prompt, options, cache)
+    if key:
+        cached = await _in_thread(get_cache().get, key)
+        if cached is not None:
+            yield cached
+            return
+
+    payload = _build_payload(prompt, stream=True, options=options)
+    pieces = []
+    async with async_stage_slot("llm"), get_async_client().stream("POST", "/api/chat", json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line:
+                delta = _parse_stream_line(line, usage)
+                pieces.append(delta)
+                yield delta
+
+    if key:
+        await _in_thread(get_cache().put, key, "".join(pieces))
+
+
+async def agenerate_response(prompt: str, options: dict = None, cache: bool = None, usage: dict = None) -> str:
+    """
+    Awaitable counterpart of generate_response(prompt, stream=False).
+    """
+    key = _cache_key(prompt, options, cache)
+    if key:
+        cached = await _in_thread(get_cache().get, key)
+        if cached is not None:
+            return cached
+
+    try:
+        payload = _build_payload(prompt, stream=False, options=options)
+        async with async_stage_slot("llm"):
+            response = await get_async_client().post("/api/chat", json=payload)
+        response.raise_for_status()
+        result = response.json()
+        _record_usage(usage, result)
+        content = result.get("message", {}).get("content", "")
     except Exception as e:
         print(f"Error communicating with Ollama: {e}")
         return ""
+
+    if key:
+        await _in_thread(get_cache().put, key, content)
+    return content
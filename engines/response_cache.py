@@ -0,0 +1,240 @@
+# engines/response_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from config import (
+    RESPONSE_CACHE_DIR,
+    RESPONSE_CACHE_MEMORY_ITEMS,
+    RESPONSE_CACHE_DISK_BYTES,
+    RESPONSE_CACHE_TTL,
+)
+
+# "created" is written first in every entry, so it can be read from the file's head
+_CREATED = re.compile(rb'^\{"created": ([0-9.eE+-]+)')
+
+
+def make_key(model: str, prompt: str, options: dict = None) -> str:
+    """
+    Content address of a request: hash of (model, prompt, options).
+    """
+    options_blob = json.dumps(options or {}, sort_keys=True, separators=(",", ":"))
+    options_hash = hashlib.sha256(options_blob.encode("utf-8")).hexdigest()
+    digest = hashlib.sha256()
+    for part in (model, prompt, options_hash):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def is_deterministic(options: dict = None) -> bool:
+    """
+    Only temperature 0 requests are safe to answer from the cache by default.
+    """
+    return bool(options) and options.get("temperature") == 0
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: an in-memory LRU in front of a directory of
+    JSON entries that is bounded by total size and expires by TTL.
+    """
+
+    def __init__(self, directory: str, memory_items: int, disk_bytes: int, ttl: float = None):
+        self.directory = directory
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_usage = None
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _remember(self, key: str, created: float, response: str):
+        self._memory[key] = (created, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        """
+        Returns the cached response for key, or None on a miss.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return entry[1]
+                del self._memory[key]
+
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                created, response = float(entry["created"]), entry["response"]
+                if not isinstance(response, str):
+                    raise TypeError("response is not text")
+            except OSError:
+                self.misses += 1
+                return None
+            except (ValueError, KeyError, TypeError):
+                self._remove_file(path)  # not an entry this cache wrote
+                self.misses += 1
+                return None
+
+            if self._expired(created):
+                self._remove_file(path)
+                self.misses += 1
+                return None
+
+            try:
+                os.utime(path, None)  # mtime doubles as the disk tier's LRU clock
+            except OSError:
+                # Evicted by another process since it was read
+                self.misses += 1
+                return None
+            self._remember(key, created, response)
+            self.hits_disk += 1
+            return response
+
+    def put(self, key: str, response: str):
+        if not response:
+            return
+        created = time.time()
+        data = json.dumps({"created": created, "response": response}).encode("utf-8")
+        path = self._path(key)
+        with self._lock:
+            self._remember(key, created, response)
+            self.stores += 1
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                previous = os.path.getsize(path) if os.path.exists(path) else 0
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"⚠️ Could not write response cache entry: {e}")
+                return
+            self._ensure_disk_usage()
+            self._disk_usage += len(data) - previous
+            if self._disk_usage > self.disk_bytes:
+                self._evict()
+
+    def _remove_file(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        if self._disk_usage is not None:
+            self._disk_usage -= size
+
+    def _scan(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".json"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _ensure_disk_usage(self):
+        if self._disk_usage is None:
+            self._disk_usage = sum(size for _, size, _ in self._scan())
+
+    def _created_at(self, path: str):
+        """
+        The entry's stored creation time, or None if the file is unreadable or malformed.
+        """
+        try:
+            with open(path, "rb") as f:
+                match = _CREATED.match(f.read(64))
+        except OSError:
+            return None
+        return float(match.group(1)) if match else None
+
+    def _evict(self):
+        """
+        Drops expired entries, then least recently used ones, until the
+        disk tier fits in its budget again. Expiry goes by each entry's
+        stored creation time; mtime is only the LRU clock, since reads refresh it.
+        """
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.disk_bytes:
+                if self.ttl is None:
+                    break
+                created = self._created_at(path)
+                if created is not None and not self._expired(created):
+                    continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._disk_usage = total
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            for _, _, path in self._scan():
+                self._remove_file(path)
+            self._disk_usage = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_bytes": self._disk_usage,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """
+    Returns the process-wide response cache.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    RESPONSE_CACHE_DIR,
+                    memory_items=RESPONSE_CACHE_MEMORY_ITEMS,
+                    disk_bytes=RESPONSE_CACHE_DISK_BYTES,
+                    ttl=RESPONSE_CACHE_TTL,
+                )
+    return _cache
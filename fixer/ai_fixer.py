@@ -0,0 +1,520 @@
+# fixer/ai_fixer.py
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from config import (
+    FIX_MAX_ITERATIONS,
+    FIX_MAX_SECONDS,
+    FIX_MAX_TOKENS,
+    FIX_CANDIDATES,
+    FIX_CANDIDATE_TEMPERATURES,
+    FIX_PROMPT_TOKEN_BUDGET,
+    USE_FIX_MEMORY,
+    FIX_FEW_SHOT_EXAMPLES,
+    FIX_FEW_SHOT_MIN_SIMILARITY,
+)
+from engines.ollama_engine import generate_response
+from fixer.error_scraper import (
+    extract_error_details,
+    failing_snippet,
+    prepare_initial_fix_prompt,
+    check_if_more_files_needed,
+    load_file_content,
+    normalize_error_message,
+    project_frames,
+    build_fix_context,
+)
+from fixer.fix_memory import (
+    get_fix_memory,
+    memory_key,
+    diff_hunks,
+    added_requirements,
+    format_example,
+    is_exact_match,
+)
+from fixer.smart_patcher import patch_file, apply_hunks
+from generator.app_generator import release_folder, scratch_folder, swap_into_place
+from pipeline.events import check_cancelled, emit, submit
+from tester.test_runner import install_requirements, project_moved, relocate_output, run_command
+
+
+class FixBudget:
+    """
+    Limits for one auto-fix session. Any limit set to None is unlimited.
+    """
+
+    def __init__(self, max_iterations: int = FIX_MAX_ITERATIONS, max_seconds: float = FIX_MAX_SECONDS,
+                 max_tokens: int = FIX_MAX_TOKENS):
+        self.max_iterations = max_iterations
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+
+    def exhausted(self, iterations: int, started: float, usage: dict):
+        """
+        Returns the name of the exhausted limit, or None.
+        """
+        if self.max_iterations is not None and iterations >= self.max_iterations:
+            return "iterations"
+        if self.max_seconds is not None and time.monotonic() - started >= self.max_seconds:
+            return "time"
+        tokens = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+        if self.max_tokens is not None and tokens >= self.max_tokens:
+            return "tokens"
+        return None
+
+
+def error_fingerprint(output: str) -> str:
+    """
+    Stable identifier of a failure: the crashed file plus the final error line
+    with addresses, numbers and quoted values masked out.
+    """
+    error_message, crashed_filename = extract_error_details(output)
+    normalized = normalize_error_message(error_message)
+    digest = hashlib.sha1(f"{crashed_filename}|{normalized}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def fix_worked(success: bool, output: str, base_path: str, original_fingerprint: str) -> bool:
+    """
+    A fix worked if the project now runs, or if it fails with a different
+    error that still traces to a project file, i.e. the program got further.
+    A different error outside the project (e.g. a wrong command's "can't
+    open file") is not progress.
+    """
+    if success:
+        return True
+    if error_fingerprint(output) == original_fingerprint:
+        return False
+    _, crashed_filename = extract_error_details(output, base_path)
+    return crashed_filename is not None
+
+
+def build_fix_prompt(base_path: str, run_cmd: str, error_output: str, token_budget: int = FIX_PROMPT_TOKEN_BUDGET,
+                     examples: int = FIX_FEW_SHOT_EXAMPLES):
+    """
+    Returns (fix_prompt, crashed_filename), or (None, reason) if the crash
+    cannot be traced to a project file.
+    Small files are sent whole; larger ones are cut down to the code around
+    the traceback frames within token_budget. Up to `examples` remembered
+    fixes for similar crashes are included as worked examples.
+    """
+    error_message, crashed_filename = extract_error_details(error_output, base_path)
+    if not crashed_filename:
+        return None, "Could not determine crashed file from error."
+
+    crashed_file_content = load_file_content(base_path, crashed_filename)
+    if not crashed_file_content:
+        return None, f"Could not load {crashed_filename}."
+
+    frames = project_frames(error_output, base_path)
+    traceback_text = "\n".join(f"  {f['path']}, line {f['line']}, in {f['function']}" for f in frames)
+    context = None
+    if len(crashed_file_content) // 4 > token_budget:
+        context = build_fix_context(base_path, frames, token_budget)
+
+    few_shot = []
+    if examples and frames:
+        snippet = failing_snippet(load_file_content(base_path, frames[-1]["path"]) or "", frames[-1]["line"])
+        similar = get_fix_memory().similar(normalize_error_message(error_message), snippet, examples,
+                                           FIX_FEW_SHOT_MIN_SIMILARITY)
+        few_shot = [format_example(entry) for entry, _ in similar]
+
+    fix_prompt = prepare_initial_fix_prompt(error_message, crashed_filename, crashed_file_content,
+                                            context=context, traceback_text=traceback_text, examples=few_shot)
+    fix_prompt += f"\nThe command used was: {run_cmd}\n"
+    fix_prompt += "If the failure is due to a wrong command, respond with 'Command: <corrected command>'. "
+    fix_prompt += "If the failure is due to code errors, respond with SEARCH/REPLACE blocks as described above."
+    return fix_prompt, crashed_filename
+
+
+def request_fix(base_path: str, fix_prompt: str, usage: dict, options: dict = None) -> str:
+    """
+    Ask the model for a fix, sending any extra files it asks to see.
+    """
+    ai_response = generate_response(fix_prompt, stream=False, options=options, usage=usage)
+    extra_files = check_if_more_files_needed(ai_response)
+    retries = 0
+    while extra_files and retries < 3:
+        retries += 1
+        for extra in extra_files:
+            content = load_file_content(base_path, extra)
+            if content:
+                fix_prompt += f"\nAdditional file {extra}:\n```python\n{content}\n```"
+        ai_response = generate_response(fix_prompt, stream=False, options=options, usage=usage)
+        extra_files = check_if_more_files_needed(ai_response)
+    return ai_response
+
+
+def apply_fix(base_path: str, run_cmd: str, filename: str, ai_response: str):
+    """
+    Apply one AI answer to the project: either a corrected command or a patch.
+    Returns (run_cmd, action).
+    """
+    if ai_response.strip().startswith("Command:"):
+        run_cmd = ai_response.split("Command:", 1)[1].strip()
+        print(f"🔄 Retrying with corrected command: {run_cmd}")
+        return run_cmd, "command"
+
+    print(f"🛠️  Applying AI Patch to {filename}...")
+    patched = patch_file(base_path, filename, ai_response)
+    emit("patch_applied", file=filename, source="model", success=patched)
+    # No-op unless the patch changed the resolved requirement set
+    install_requirements(base_path)
+    return run_cmd, "patch"
+
+
+def _snapshot(base_path: str, filename: str) -> dict:
+    return {name: load_file_content(base_path, name) for name in (filename, "requirements.txt") if name}
+
+
+def _restore(base_path: str, snapshot: dict):
+    for name, content in snapshot.items():
+        path = os.path.join(base_path, name)
+        if content is None:
+            if os.path.exists(path):
+                os.remove(path)
+            continue
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def apply_remembered_fix(base_path: str, run_cmd: str, filename: str, fix: dict, exact: bool = False):
+    """
+    Apply a fix from memory. Hunks must all apply (verbatim, with exact) and
+    the result must compile.
+    Returns the run command to use, or None if the fix does not fit this project.
+    """
+    if fix.get("hunks"):
+        code = load_file_content(base_path, filename) if filename else None
+        if code is None:
+            return None
+        updated, conflicts = apply_hunks(code, [tuple(hunk) for hunk in fix["hunks"]], exact=exact)
+        if conflicts:
+            return None
+        if filename.endswith(".py"):
+            try:
+                compile(updated, filename, "exec")
+            except SyntaxError:
+                return None
+        with open(os.path.join(base_path, filename), "w", encoding="utf-8") as f:
+            f.write(updated)
+        emit("patch_applied", file=filename, source="memory", success=True)
+
+    if fix.get("requirements"):
+        current = load_file_content(base_path, "requirements.txt") or ""
+        missing = added_requirements(current, "\n".join(fix["requirements"]))
+        if missing:
+            with open(os.path.join(base_path, "requirements.txt"), "a", encoding="utf-8") as f:
+                f.write(("" if not current or current.endswith("\n") else "\n") + "\n".join(missing) + "\n")
+        install_requirements(base_path)
+
+    return fix.get("command") or run_cmd
+
+
+def fix_from_memory(base_path: str, run_cmd: str, error_output: str, key: tuple, max_attempts: int = 3):
+    """
+    Try remembered fixes for this failure without calling the model.
+    Fixes learned on other code must apply verbatim. A fix that does not
+    work (see fix_worked) is rolled back and counted against it.
+    Returns (success, output, run_cmd), or None.
+    """
+    memory = get_fix_memory()
+    entries = memory.lookup(*key)
+    if not entries:
+        return None
+    _, filename = extract_error_details(error_output, base_path)
+    original_fingerprint = error_fingerprint(error_output)
+
+    for entry in entries[:max_attempts]:
+        snapshot = _snapshot(base_path, filename)
+        new_cmd = apply_remembered_fix(base_path, run_cmd, filename, entry["fix"],
+                                       exact=not is_exact_match(entry, key[1]))
+        if new_cmd is None:
+            _restore(base_path, snapshot)
+            continue
+        print("🧠 Applying remembered fix...")
+        success, output = run_command(base_path, new_cmd)
+        worked = fix_worked(success, output, base_path, original_fingerprint)
+        memory.record_outcome(entry["key"], worked)
+        if worked:
+            return success, output, new_cmd
+        print("↩️ Remembered fix did not help; rolling it back.")
+        _restore(base_path, snapshot)
+        if entry["fix"].get("requirements"):
+            install_requirements(base_path)
+    return None
+
+
+def remember_fix(base_path: str, key: tuple, error_output: str, filename: str, before: dict,
+                 run_cmd_before: str, run_cmd: str):
+    """
+    Store what changed since the before snapshot as a fix for this failure.
+    """
+    fix = {
+        "hunks": diff_hunks(before[filename] or "", load_file_content(base_path, filename) or ""),
+        "requirements": added_requirements(before.get("requirements.txt"), load_file_content(base_path, "requirements.txt")),
+        "command": run_cmd if run_cmd != run_cmd_before else None,
+    }
+    if fix["hunks"] or fix["requirements"] or fix["command"]:
+        error_message, _ = extract_error_details(error_output, base_path)
+        frames = project_frames(error_output, base_path)
+        snippet = ""
+        if frames and frames[-1]["path"] == filename:
+            snippet = failing_snippet(before.get(filename) or "", frames[-1]["line"])
+        get_fix_memory().remember(key[0], key[1], normalize_error_message(error_message), fix, snippet)
+
+
+def progress_score(output: str, original_fingerprint: str):
+    """
+    How far a failing run got, for ranking fix candidates: a different error
+    beats the original one, then more output before the traceback means the
+    program ran further.
+    """
+    before_traceback = output.split("Traceback (most recent call last)", 1)[0]
+    return (error_fingerprint(output) != original_fingerprint, len(before_traceback.splitlines()))
+
+
+class _CopyGate:
+    """
+    Lets fix candidates copy base_path concurrently until close(), which
+    waits for copies in progress and turns away later ones, so base_path
+    can be replaced without a candidate still reading from it.
+    """
+
+    def __init__(self):
+        self._changed = threading.Condition()
+        self._copying = 0
+        self._closed = False
+
+    @contextmanager
+    def copying(self):
+        """
+        Yields False if the gate is closed and nothing may be copied any more.
+        """
+        with self._changed:
+            if self._closed:
+                yield False
+                return
+            self._copying += 1
+        try:
+            yield True
+        finally:
+            with self._changed:
+                self._copying -= 1
+                self._changed.notify_all()
+
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.wait_for(lambda: self._copying == 0)
+
+
+def _copy_project(base_path: str, target: str):
+    # Plain copies rather than hardlinks: a candidate's run may write to its
+    # files in place, which would leak into the original through a shared inode.
+    shutil.rmtree(target, ignore_errors=True)
+    shutil.copytree(base_path, target, ignore=shutil.ignore_patterns("__pycache__"))
+
+
+def _try_candidate(index: int, base_path: str, scratch_path: str, run_cmd: str, filename: str,
+                   fix_prompt: str, cancel: threading.Event, gate: _CopyGate) -> dict:
+    usage = {}
+    result = {"index": index, "path": scratch_path, "usage": usage, "run_cmd": run_cmd, "success": False,
+              "message": "", "action": None}
+    temperature = FIX_CANDIDATE_TEMPERATURES[index % len(FIX_CANDIDATE_TEMPERATURES)]
+    ai_response = request_fix(base_path, fix_prompt, usage, options={"temperature": temperature, "seed": index + 1})
+    if cancel.is_set() or not ai_response.strip():
+        return result
+
+    with gate.copying() as allowed:
+        if not allowed or cancel.is_set():
+            return result
+        _copy_project(base_path, scratch_path)
+    result["run_cmd"], result["action"] = apply_fix(scratch_path, run_cmd, filename, ai_response)
+    if cancel.is_set():
+        return result
+    result["success"], result["message"] = run_command(scratch_path, result["run_cmd"])
+    return result
+
+
+def explore_fixes(base_path: str, run_cmd: str, fix_prompt: str, filename: str, error_output: str,
+                  n: int, usage: dict):
+    """
+    Ask for n fix candidates concurrently, apply each to its own copy of the
+    project and re-run them in parallel. The first candidate that passes wins;
+    otherwise the one that got furthest (see progress_score) is kept, provided
+    it changed the error at all. The kept copy replaces base_path.
+
+    Returns (success, output, run_cmd, action), or None if no candidate made progress.
+    """
+    print(f"🔀 Exploring {n} fix candidates in parallel...")
+    original_fingerprint = error_fingerprint(error_output)
+    cancel = threading.Event()
+    gate = _CopyGate()
+    scratch_paths = [scratch_folder(base_path, "fix") for _ in range(n)]
+    executor = ThreadPoolExecutor(max_workers=n, thread_name_prefix="fix-candidate")
+    futures = [
+        submit(executor, _try_candidate, i, base_path, scratch_paths[i], run_cmd, filename, fix_prompt, cancel, gate)
+        for i in range(n)
+    ]
+
+    results = []
+    chosen = None
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"⚠️ Fix candidate failed: {e}")
+            continue
+        results.append(result)
+        if result["success"]:
+            print(f"🏆 Fix candidate {result['index'] + 1} passed.")
+            chosen = result
+            break
+
+    cancel.set()
+    for future in futures:
+        future.cancel()
+    gate.close()  # losing candidates may still be copying base_path
+
+    if chosen is None:
+        ranked = [r for r in results if r["action"] and progress_score(r["message"], original_fingerprint)[0]]
+        if ranked:
+            chosen = max(ranked, key=lambda r: progress_score(r["message"], original_fingerprint))
+            print(f"📈 No candidate passed; keeping candidate {chosen['index'] + 1}, which got furthest.")
+
+    for result in results:
+        for key in ("prompt_tokens", "completion_tokens"):
+            usage[key] = usage.get(key, 0) + result["usage"].get(key, 0)
+
+    if chosen is not None:
+        swap_into_place(chosen["path"], base_path)
+        project_moved(chosen["path"], base_path)
+        # Its run happened in the scratch copy; point the traceback at the files now in base_path
+        chosen["message"] = relocate_output(chosen["message"], chosen["path"], base_path)
+
+    def cleanup():
+        wait(futures)
+        executor.shutdown()
+        for path in scratch_paths:
+            if chosen is None or path != chosen["path"]:
+                shutil.rmtree(path, ignore_errors=True)
+            release_folder(path)
+
+    threading.Thread(target=cleanup, name="fix-candidate-cleanup").start()
+
+    if chosen is None:
+        return None
+    return chosen["success"], chosen["message"], chosen["run_cmd"], chosen["action"]
+
+
+def auto_fix(base_path: str, run_cmd: str, error_output: str, budget: FixBudget = None,
+             candidates: int = FIX_CANDIDATES, use_memory: bool = USE_FIX_MEMORY):
+    """
+    Loop error -> prompt -> patch -> re-run until the project runs or the budget
+    runs out. Stops early when a patch brings back an error fingerprint that was
+    already seen, since the model is then going in circles.
+
+    The project's environment and warm interpreter are reused between iterations;
+    dependencies are only reinstalled when the resolved requirement set changes.
+    With candidates > 1 each iteration explores that many fixes in parallel.
+    With use_memory, fixes that worked before for the same error are tried
+    first, and every fix that works (see fix_worked) is remembered.
+
+    Returns (success: bool, output: str, report: dict).
+    """
+    budget = budget or FixBudget()
+    started = time.monotonic()
+    usage = {}
+    iterations = []
+    seen = set()
+    message = error_output
+    report = {"iterations": iterations, "usage": usage, "run_cmd": run_cmd, "stop_reason": None}
+
+    while True:
+        check_cancelled()
+        limit = budget.exhausted(len(iterations), started, usage)
+        if limit:
+            print(f"⏹️ Auto-fix budget exhausted ({limit}).")
+            report["stop_reason"] = f"budget:{limit}"
+            break
+
+        fingerprint = error_fingerprint(message)
+        if fingerprint in seen:
+            print("⏹️ Same error came back after patching; stopping auto-fix.")
+            report["stop_reason"] = "no_progress"
+            break
+        seen.add(fingerprint)
+
+        iteration = {"iteration": len(iterations) + 1, "fingerprint": fingerprint}
+        iteration_started = time.monotonic()
+        tokens_before = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+        print(f"\n🧠 Auto-fix iteration {iteration['iteration']}...\n")
+
+        key = memory_key(base_path, message) if use_memory else None
+        remembered = fix_from_memory(base_path, run_cmd, message, key) if use_memory else None
+        if remembered is not None:
+            success, message, run_cmd = remembered
+            report["run_cmd"] = run_cmd
+            iteration.update(action="memory", success=success, tokens=0,
+                             seconds=round(time.monotonic() - iteration_started, 3))
+            iterations.append(iteration)
+            if success:
+                print("✅ Project ran successfully with a remembered fix!")
+                report["stop_reason"] = "success"
+                break
+            print("❌ Still failing after remembered fix:")
+            print(message)
+            continue
+
+        fix_prompt, detail = build_fix_prompt(base_path, run_cmd, message,
+                                              examples=FIX_FEW_SHOT_EXAMPLES if use_memory else 0)
+        if fix_prompt is None:
+            print(f"❌ {detail}")
+            report["stop_reason"] = "untraceable"
+            break
+
+        previous_message, previous_cmd = message, run_cmd
+        before = _snapshot(base_path, detail) if use_memory else None
+        if candidates > 1:
+            explored = explore_fixes(base_path, run_cmd, fix_prompt, detail, message, candidates, usage)
+            if explored is None:
+                print("❌ No fix candidate made progress.")
+                report["stop_reason"] = "no_progress"
+                break
+            success, message, run_cmd, iteration["action"] = explored
+            report["run_cmd"] = run_cmd
+        else:
+            ai_response = request_fix(base_path, fix_prompt, usage)
+            if not ai_response.strip():
+                print("❌ No fix suggested.")
+                report["stop_reason"] = "no_response"
+                break
+
+            run_cmd, iteration["action"] = apply_fix(base_path, run_cmd, detail, ai_response)
+            report["run_cmd"] = run_cmd
+            print("\n🛠️  Re-running project command after auto-fix...")
+            success, message = run_command(base_path, run_cmd)
+
+        if use_memory and fix_worked(success, message, base_path, fingerprint):
+            remember_fix(base_path, key, previous_message, detail, before, previous_cmd, run_cmd)
+
+        iteration["success"] = success
+        iteration["seconds"] = round(time.monotonic() - iteration_started, 3)
+        iteration["tokens"] = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0) - tokens_before
+        iterations.append(iteration)
+
+        if success:
+            print("✅ Project ran successfully after auto-fix!")
+            report["stop_reason"] = "success"
+            break
+        print("❌ Still failing after auto-fix:")
+        print(message)
+
+    report["seconds"] = round(time.monotonic() - started, 3)
+    return report["stop_reason"] == "success", message, report
@@ -3,17 +3,55 @@
 import re
 import os
 
-def extract_error_details(stderr_text: str):
+_FRAME = re.compile(r'^\s*File "(.*?)", line (\d+)(?:, in (.+))?$', re.MULTILINE)
+_LIBRARY_MARKERS = ("site-packages", "dist-packages", "/lib/python", "\\lib\\python", "<frozen", "<string>")
+
+def parse_traceback(stderr_text: str):
+    """
+    Extracts every frame of the (last) traceback in stderr output.
+    Returns a list of {"file", "line", "function"} dicts, outermost first.
+    """
+    start = stderr_text.rfind("Traceback (most recent call last)")
+    text = stderr_text[start:] if start != -1 else stderr_text
+    return [
+        {"file": m.group(1), "line": int(m.group(2)), "function": (m.group(3) or "").strip()}
+        for m in _FRAME.finditer(text)
+    ]
+
+def project_relative_path(frame_file: str, base_path: str = None):
+    """
+    Returns the frame's file relative to the project, or None if it is library code.
+    """
+    if any(marker in frame_file for marker in _LIBRARY_MARKERS):
+        return None
+    if base_path is None:
+        return os.path.basename(frame_file)
+    root = os.path.abspath(base_path)
+    full_path = os.path.abspath(os.path.join(root, frame_file))
+    if os.path.commonpath([root, full_path]) != root:
+        return None
+    return os.path.relpath(full_path, root)
+
+def project_frames(stderr_text: str, base_path: str = None):
+    """
+    Traceback frames that point into the project, outermost first,
+    each with an extra "path" key relative to the project.
+    """
+    frames = []
+    for frame in parse_traceback(stderr_text):
+        path = project_relative_path(frame["file"], base_path)
+        if path:
+            frames.append(dict(frame, path=path))
+    return frames
+
+def extract_error_details(stderr_text: str, base_path: str = None):
     """
     Extracts error message and crashed filename from stderr output.
+    The crashed file is the deepest traceback frame inside the project.
     Returns (error_message, filename) or (error_message, None) if not found.
     """
-    # Try to find filename in the stack trace
-    match = re.search(r'File \"(.*?)\", line (\d+)', stderr_text)
-    if match:
-        filename = os.path.basename(match.group(1))
-    else:
-        filename = None
+    frames = project_frames(stderr_text, base_path)
+    filename = frames[-1]["path"] if frames else None
 
     # Grab the last line of the error for the main message
     lines = stderr_text.strip().splitlines()
@@ -21,10 +59,134 @@ def extract_error_details(stderr_text: str):
 
     return error_message, filename
 
-def prepare_initial_fix_prompt(error_message: str, filename: str, file_content: str):
+def normalize_error_message(error_message: str) -> str:
+    """
+    Error line with addresses, quoted values and numbers masked out, so the
+    same failure compares equal across runs and projects.
+    """
+    normalized = re.sub(r"0x[0-9a-fA-F]+", "<addr>", error_message)
+    normalized = re.sub(r"(['\"]).*?\1", "<str>", normalized)
+    return re.sub(r"\d+", "<n>", normalized)
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def _enclosing_block(blocks: dict, line: int):
+    """
+    Innermost def/class whose span contains line, or None.
+    """
+    best = None
+    for block in blocks.values():
+        node = block.node
+        if not block.is_definition:
+            continue
+        if node.lineno <= line <= node.end_lineno:
+            if best is None or node.end_lineno - node.lineno < best.node.end_lineno - best.node.lineno:
+                best = block
+    return best
+
+def failing_snippet(content: str, line: int, radius: int = 2) -> str:
+    """
+    The failing line with radius lines around it, dedented.
+    """
+    lines = content.splitlines()[max(line - 1 - radius, 0):line + radius]
+    indent = min((len(l) - len(l.lstrip()) for l in lines if l.strip()), default=0)
+    return "\n".join(l[indent:] for l in lines)
+
+def _line_window(content: str, line: int, radius: int = 15):
+    lines = content.splitlines()
+    first = max(line - radius, 1)
+    last = min(line + radius, len(lines))
+    return first, last, "\n".join(lines[first - 1:last])
+
+def build_fix_context(base_path: str, frames: list, token_budget: int):
+    """
+    Builds the code context for a fix prompt from traceback frames instead of
+    whole files: for each project frame, deepest first, the enclosing function
+    or class, then each file's imports and the signatures of its other
+    top-level definitions, until token_budget is used up.
+    Returns the context text.
+    """
+    from fixer.smart_patcher import index_blocks
+
+    sections = []
+    used = 0
+    seen_spans = set()
+    file_info = {}
+
+    def add(section: str) -> bool:
+        nonlocal used
+        cost = _estimate_tokens(section)
+        if used + cost > token_budget:
+            return False
+        sections.append(section)
+        used += cost
+        return True
+
+    for frame in reversed(frames):
+        path = frame["path"]
+        if path not in file_info:
+            content = load_file_content(base_path, path)
+            blocks, imports = {}, []
+            if content is not None and path.endswith(".py"):
+                try:
+                    blocks, imports = index_blocks(content)
+                except (SyntaxError, ValueError):
+                    pass
+            file_info[path] = (content, blocks, imports)
+        content, blocks, _ = file_info[path]
+        if content is None:
+            continue
+
+        block = _enclosing_block(blocks, frame["line"])
+        if block is not None:
+            first, last = block.node.lineno, block.node.end_lineno
+            snippet = content[block.start:block.end].rstrip("\n")
+        else:
+            first, last, snippet = _line_window(content, frame["line"])
+        if (path, first, last) in seen_spans:
+            continue
+        seen_spans.add((path, first, last))
+
+        header = f"# {path}, lines {first}-{last} (error at line {frame['line']}, in {frame['function']}):"
+        section = f"{header}\n```python\n{snippet}\n```"
+        if not add(section) and block is not None:
+            # Enclosing block too large: fall back to a window around the failing line
+            first, last, snippet = _line_window(content, frame["line"], radius=8)
+            add(f"# {path}, lines {first}-{last} (error at line {frame['line']}):\n```python\n{snippet}\n```")
+
+    for path, (content, blocks, imports) in file_info.items():
+        if content is None or not blocks and not imports:
+            continue
+        outline = [text for text, _ in imports]
+        for block in blocks.values():
+            if block.parent is None and block.is_definition:
+                outline.append(content.splitlines()[block.node.lineno - 1])
+                for child in block.children:
+                    child_node = blocks[child].node
+                    outline.append(content.splitlines()[child_node.lineno - 1])
+        if outline:
+            add(f"# {path} imports and signatures:\n```python\n" + "\n".join(outline) + "\n```")
+
+    return "\n\n".join(sections)
+
+def prepare_initial_fix_prompt(error_message: str, filename: str, file_content: str, context: str = None,
+                               traceback_text: str = None, examples: list = None):
     """
     Prepare the first prompt to AI for fixing the crash.
+    When context is given it replaces the full file content with only the
+    code around the failing frames. examples are fixes that worked for
+    similar errors, shown before the code.
     """
+    if context:
+        code_section = f"Relevant code (only the parts around the error):\n{context}"
+    else:
+        code_section = f"Code in {filename}:\n```python\n{file_content}\n```"
+    traceback_section = f"\nTraceback:\n{traceback_text}\n" if traceback_text else ""
+    examples_section = ""
+    if examples:
+        examples_section = "\nFixes that worked for similar crashes before:\n\n" + "\n\n".join(examples) + "\n"
+
     prompt = f"""
 You are a senior software engineer.
 
@@ -32,18 +194,24 @@ The following app crashed.
 
 Crash error:
 {error_message}
-
-Code in {filename}:
-```python
-{file_content}
-```
+{traceback_section}{examples_section}
+{code_section}
 
 Please analyze the code and suggest minimal corrections to fix the crash.
 
 If you need to see any other files to understand better, just reply:
 "Please show me [filename]".
 
-Otherwise, please provide the fixed version of {filename}.
+Otherwise, reply only with the edits to {filename}, as one or more SEARCH/REPLACE blocks:
+
+<<<<<<< SEARCH
+exact lines copied from {filename}
+=======
+the corrected lines
+>>>>>>> REPLACE
+
+Keep each SEARCH section short: only the lines that change plus a line of context.
+Do not repeat the whole file.
     """.strip()
 
     return prompt
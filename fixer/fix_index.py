@@ -0,0 +1,117 @@
+# fixer/fix_index.py
+#
+# MinHash index over past (error, code snippet) pairs for finding fixes to
+# similar failures. Pure Python and in-process: signatures are short lists of
+# ints and candidates come from LSH buckets, so a query touches only entries
+# that share at least one band with it.
+
+import builtins
+import keyword
+import re
+import zlib
+
+NUM_PERM = 32
+BAND_ROWS = 2
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed (a, b) pairs for the permutations h(x) = (a * x + b) mod p,
+# derived from crc32 so signatures are stable across processes.
+_PERMUTATIONS = [
+    (zlib.crc32(f"a{i}".encode()) * 2654435761 % _PRIME | 1, zlib.crc32(f"b{i}".encode()) * 40503 % _PRIME)
+    for i in range(NUM_PERM)
+]
+
+_TOKEN = re.compile(r"[A-Za-z_]\w*|\d+|[^\s\w]")
+_KNOWN_NAMES = set(keyword.kwlist) | set(dir(builtins))
+
+
+def _abstract(token: str) -> str:
+    if token[0].isdigit():
+        return "<n>"
+    if (token[0].isalpha() or token[0] == "_") and token not in _KNOWN_NAMES:
+        return "<id>"
+    return token
+
+
+def _grams(tokens: list, size: int) -> list:
+    if len(tokens) < size:
+        return tokens
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """
+    Hashed token n-grams of text, both as written and with user-defined
+    names abstracted away, so the same mistake matches under different
+    variable names.
+    """
+    tokens = _TOKEN.findall(text)
+    grams = _grams([token.lower() for token in tokens], size)
+    grams += ["~" + gram for gram in _grams([_abstract(token) for token in tokens], size)]
+    return {zlib.crc32(gram.encode("utf-8")) for gram in grams}
+
+
+def minhash(shingle_set: set) -> tuple:
+    if not shingle_set:
+        return tuple([_MAX_HASH] * NUM_PERM)
+    return tuple(
+        min((a * x + b) % _PRIME for x in shingle_set) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(sig_a: tuple, sig_b: tuple) -> float:
+    """
+    Estimated Jaccard similarity of the shingle sets behind two signatures.
+    """
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class MinHashIndex:
+    """
+    Maps keys to MinHash signatures with LSH buckets for candidate lookup.
+    add() and remove() update the buckets incrementally.
+    """
+
+    def __init__(self):
+        self._signatures = {}
+        self._buckets = {}
+
+    def _bands(self, signature: tuple):
+        for start in range(0, NUM_PERM, BAND_ROWS):
+            yield start, signature[start:start + BAND_ROWS]
+
+    def add(self, key: str, text: str):
+        self.remove(key)
+        signature = minhash(shingles(text))
+        self._signatures[key] = signature
+        for band in self._bands(signature):
+            self._buckets.setdefault(band, set()).add(key)
+
+    def remove(self, key: str):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band in self._bands(signature):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def query(self, text: str, k: int = 3, min_similarity: float = 0.0):
+        """
+        Returns up to k (key, similarity) pairs, most similar first.
+        """
+        signature = minhash(shingles(text))
+        candidates = set()
+        for band in self._bands(signature):
+            candidates.update(self._buckets.get(band, ()))
+        scored = [(key, similarity(signature, self._signatures[key])) for key in candidates]
+        scored = [pair for pair in scored if pair[1] >= min_similarity]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored[:k]
+
+    def __len__(self):
+        return len(self._signatures)
@@ -0,0 +1,313 @@
+# fixer/fix_memory.py
+#
+# Remembers fixes that worked, keyed by (error fingerprint, code signature),
+# so repeat failures are fixed without asking the model again.
+#
+# knowledge_base.json holds a compacted snapshot; changes since the last
+# compaction are appended to a journal next to it and folded in once the
+# journal grows past FIX_MEMORY_COMPACT_AFTER records.
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from config import FIX_MEMORY_PATH, FIX_MEMORY_MAX_ENTRIES, FIX_MEMORY_COMPACT_AFTER
+from fixer.error_scraper import extract_error_details, normalize_error_message, project_frames, load_file_content
+from fixer.fix_index import MinHashIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+_MISSING_MODULE = re.compile(r"No module named ['\"]([\w.]+)['\"]")
+
+
+def memory_key(base_path: str, error_output: str):
+    """
+    Returns (fingerprint, signature) for a failure.
+    The fingerprint is the masked error line, independent of the project;
+    the signature identifies the code that failed: the missing module for
+    import errors, otherwise a hash of the failing source line.
+    """
+    error_message, _ = extract_error_details(error_output, base_path)
+    fingerprint = hashlib.sha1(normalize_error_message(error_message).encode("utf-8")).hexdigest()[:16]
+
+    missing = _MISSING_MODULE.search(error_message)
+    if missing:
+        return fingerprint, f"module:{missing.group(1).split('.')[0]}"
+
+    frames = project_frames(error_output, base_path)
+    if not frames:
+        return fingerprint, ""
+    content = load_file_content(base_path, frames[-1]["path"]) or ""
+    lines = content.splitlines()
+    line_no = frames[-1]["line"]
+    source_line = lines[line_no - 1] if 0 < line_no <= len(lines) else ""
+    normalized = " ".join(source_line.split())
+    return fingerprint, hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def is_exact_match(entry: dict, signature: str) -> bool:
+    """
+    True if a remembered fix was learned on this same failing code, not just the same error.
+    """
+    return bool(signature) and entry["signature"] == signature
+
+
+def _is_code_edit(fix: dict) -> bool:
+    return bool(fix.get("hunks")) and not fix.get("command") and not fix.get("requirements")
+
+
+def diff_hunks(old: str, new: str, context: int = 1):
+    """
+    The change from old to new as (search, replace) text pairs, each with a
+    line of context so it can be located again in another copy of the file.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    hunks = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for group in matcher.get_grouped_opcodes(context):
+        i1, i2 = group[0][1], group[-1][2]
+        j1, j2 = group[0][3], group[-1][4]
+        hunks.append(("".join(old_lines[i1:i2]), "".join(new_lines[j1:j2])))
+    return hunks
+
+
+def added_requirements(old: str, new: str):
+    old_lines = {line.strip() for line in (old or "").splitlines()}
+    return [line.strip() for line in (new or "").splitlines() if line.strip() and line.strip() not in old_lines]
+
+
+def format_example(entry: dict) -> str:
+    """
+    A remembered fix written out as a worked example for a fix prompt.
+    """
+    fix = entry["fix"]
+    parts = [f"Error: {entry['error']}"]
+    if entry.get("snippet"):
+        parts.append(f"Code:\n```python\n{entry['snippet']}\n```")
+    parts.append("Fix:")
+    for search, replace in fix.get("hunks", []):
+        parts.append(f"<<<<<<< SEARCH\n{search.rstrip()}\n=======\n{replace.rstrip()}\n>>>>>>> REPLACE")
+    if fix.get("requirements"):
+        parts.append("Added to requirements.txt: " + ", ".join(fix["requirements"]))
+    if fix.get("command"):
+        parts.append(f"Command: {fix['command']}")
+    return "\n".join(parts)
+
+
+class FixMemory:
+    """
+    In-memory index over the fix store, loaded on first use.
+    """
+
+    def __init__(self, path: str, max_entries: int, compact_after: int):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.max_entries = max_entries
+        self.compact_after = compact_after
+        self._entries = None  # key -> entry
+        self._by_fingerprint = {}  # fingerprint -> set of keys
+        self._similar = MinHashIndex()  # key -> (error, snippet) signature
+        self._journal_records = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_disk(self):
+        entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+            if text.strip():
+                for entry in json.loads(text).get("entries", []):
+                    entries[entry["key"]] = entry
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"⚠️ Ignoring unreadable fix memory {self.path}: {e}")
+
+        records = 0
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn write from a crashed process
+                    records += 1
+                    self._replay(entries, record)
+        except OSError:
+            pass
+        return entries, records
+
+    @staticmethod
+    def _replay(entries: dict, record: dict):
+        if record["op"] == "put":
+            entries[record["entry"]["key"]] = record["entry"]
+            return
+        entry = entries.get(record["key"])
+        if entry is None:
+            return
+        if record["op"] == "hit":
+            entry["successes"] += 1
+            entry["last_used"] = record["time"]
+        elif record["op"] == "miss":
+            entry["failures"] += 1
+            entry["last_used"] = record["time"]
+
+    @staticmethod
+    def _similarity_text(entry: dict) -> str:
+        snippet = entry.get("snippet") or "\n".join(search for search, _ in entry["fix"].get("hunks", []))
+        return f"{entry['error']}\n{snippet}"
+
+    def _index(self, entries: dict, records: int):
+        self._entries = entries
+        self._journal_records = records
+        self._by_fingerprint = {}
+        self._similar = MinHashIndex()
+        for key, entry in entries.items():
+            self._by_fingerprint.setdefault(entry["fingerprint"], set()).add(key)
+            self._similar.add(key, self._similarity_text(entry))
+
+    def _ensure_loaded(self):
+        if self._entries is None:
+            self._index(*self._read_disk())
+
+    def _append(self, record: dict):
+        self._replay(self._entries, record)
+        if record["op"] == "put":
+            entry = record["entry"]
+            self._by_fingerprint.setdefault(entry["fingerprint"], set()).add(entry["key"])
+            self._similar.add(entry["key"], self._similarity_text(entry))
+        try:
+            with self._file_lock():
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.journal_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write fix memory: {e}")
+            return
+        self._journal_records += 1
+        if self._journal_records >= self.compact_after or len(self._entries) > self.max_entries:
+            self._compact()
+
+    @staticmethod
+    def _score(entry: dict):
+        return (entry["successes"] - 2 * entry["failures"], entry["last_used"])
+
+    def _compact(self):
+        """
+        Fold the journal into the snapshot and drop the weakest entries
+        beyond max_entries. Re-reads the disk first so records appended by
+        other processes are kept.
+        """
+        try:
+            with self._file_lock():
+                entries, _ = self._read_disk()
+                if len(entries) > self.max_entries:
+                    kept = sorted(entries.values(), key=self._score, reverse=True)[:self.max_entries]
+                    entries = {entry["key"]: entry for entry in kept}
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"version": 1, "entries": sorted(entries.values(), key=lambda e: e["key"])}, f, indent=1)
+                os.replace(tmp_path, self.path)
+                open(self.journal_path, "w").close()
+        except OSError as e:
+            print(f"⚠️ Could not compact fix memory: {e}")
+            return
+        self._index(entries, 0)
+
+    def lookup(self, fingerprint: str, signature: str):
+        """
+        Remembered fixes for this failure, best first: the exact
+        (fingerprint, signature) match, then fixes for the same error
+        elsewhere. Fixes that failed more often than they worked are skipped.
+        Fixes learned on other code are only offered when they are plain code
+        edits: a remembered command or package list belongs to its own project.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entries = [self._entries[key] for key in self._by_fingerprint.get(fingerprint, ())]
+        entries = [entry for entry in entries if entry["failures"] <= entry["successes"]
+                   and (is_exact_match(entry, signature) or _is_code_edit(entry["fix"]))]
+        entries.sort(key=lambda e: (is_exact_match(e, signature), self._score(e)), reverse=True)
+        if signature.startswith("module:"):
+            # A missing-module fix only applies to that same module
+            entries = [entry for entry in entries if entry["signature"] == signature]
+        return entries
+
+    def similar(self, error: str, snippet: str, k: int = 3, min_similarity: float = 0.25):
+        """
+        Up to k remembered fixes whose (error, code snippet) is closest to
+        this one by MinHash similarity, as (entry, similarity) pairs.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            matches = self._similar.query(f"{error}\n{snippet}", k * 2, min_similarity)
+            entries = [(self._entries[key], score) for key, score in matches]
+        entries = [(entry, score) for entry, score in entries if entry["failures"] <= entry["successes"]]
+        return entries[:k]
+
+    def remember(self, fingerprint: str, signature: str, error: str, fix: dict, snippet: str = ""):
+        """
+        Store a fix that made this failure go away, with the code it was
+        applied to for similarity search.
+        """
+        key = f"{fingerprint}:{signature}:{hashlib.sha1(json.dumps(fix, sort_keys=True).encode('utf-8')).hexdigest()[:12]}"
+        with self._lock:
+            self._ensure_loaded()
+            if key in self._entries:
+                self._append({"op": "hit", "key": key, "time": time.time()})
+                return
+            now = time.time()
+            entry = {"key": key, "fingerprint": fingerprint, "signature": signature, "error": error, "fix": fix,
+                     "snippet": snippet, "successes": 1, "failures": 0, "created": now, "last_used": now}
+            self._append({"op": "put", "entry": entry})
+
+    def record_outcome(self, key: str, worked: bool):
+        with self._lock:
+            self._ensure_loaded()
+            self._append({"op": "hit" if worked else "miss", "key": key, "time": time.time()})
+
+    def compact(self):
+        with self._lock:
+            self._ensure_loaded()
+            self._compact()
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._entries)
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_fix_memory() -> FixMemory:
+    """
+    Returns the process-wide fix memory. Nothing is read from disk until
+    the first lookup.
+    """
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            _memory = FixMemory(FIX_MEMORY_PATH, FIX_MEMORY_MAX_ENTRIES, FIX_MEMORY_COMPACT_AFTER)
+        return _memory
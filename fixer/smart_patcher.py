@@ -1,115 +1,465 @@
 # fixer/smart_patcher.py
 
-import re
+import ast
+import difflib
 import os
+import re
+import textwrap
+
+_FENCE = re.compile(r"```[ \t]*(?:python|py)?[ \t]*\n(.*?)```", re.DOTALL)
+_SEARCH_REPLACE = re.compile(
+    r"^<{5,9} ?SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} ?REPLACE[^\n]*$",
+    re.DOTALL | re.MULTILINE,
+)
+_HUNK_HEADER = re.compile(r"^@@ .* @@")
+# Minimum similarity for a fuzzy hunk match
+FUZZY_THRESHOLD = 0.8
+_BLOCK_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+class Block:
+    """
+    A named span of source: [start, end) character offsets covering whole lines,
+    decorators included.
+    """
+
+    def __init__(self, name: str, node, start: int, end: int, parent: str = None):
+        self.name = name
+        self.node = node
+        self.start = start
+        self.end = end
+        self.parent = parent
+        self.children = []
+
+    @property
+    def is_definition(self) -> bool:
+        """
+        True for functions and classes, False for indexed module-level statements.
+        """
+        return isinstance(self.node, _BLOCK_TYPES)
+
+
+def extract_code(ai_response: str) -> str:
+    """
+    Pull the code out of an AI answer: the largest fenced block if there is one,
+    otherwise the text itself without a leading 'Change:' label.
+    """
+    blocks = _FENCE.findall(ai_response)
+    if blocks:
+        return max(blocks, key=len)
+    text = ai_response.strip()
+    if text.startswith("Change:"):
+        text = text[len("Change:"):].lstrip("\n")
+    return text
+
+
+def _line_offsets(code: str) -> list:
+    """
+    offsets[i] is the character offset where line i + 1 starts; the last entry is len(code).
+    """
+    offsets = [0]
+    for line in code.splitlines(keepends=True):
+        offsets.append(offsets[-1] + len(line))
+    return offsets
+
+
+def _statement_key(node, code: str):
+    """
+    Name for a module-level statement that is not a def/class, or None if it cannot be matched.
+    Assignments are named by their targets, calls by the callee ("call:app.run"),
+    other expressions just "expr"; repeats are told apart by position (see index_blocks).
+    """
+    if isinstance(node, ast.Assign):
+        targets = [ast.get_source_segment(code, t) for t in node.targets]
+        return "=" + ",".join(targets) if all(targets) else None
+    if isinstance(node, (ast.AnnAssign, ast.AugAssign)):
+        target = ast.get_source_segment(code, node.target)
+        return "=" + target if target else None
+    if (
+        isinstance(node, ast.If)
+        and isinstance(node.test, ast.Compare)
+        and isinstance(node.test.left, ast.Name)
+        and node.test.left.id == "__name__"
+    ):
+        return "__main__"
+    if isinstance(node, ast.Expr):
+        if isinstance(node.value, ast.Call):
+            func = ast.get_source_segment(code, node.value.func)
+            return "call:" + " ".join(func.split()) if func else None
+        return "expr"
+    return None
+
+
+def index_blocks(code: str, tree=None):
+    """
+    Build the qualified-name -> Block index of a module in one pass over its AST.
+    Functions, async functions and classes are indexed at any depth
+    ("Class.method", "outer.inner"). Module-level assignments, expression
+    statements (e.g. `app.run(port=5000)`) and the `if __name__ == "__main__":`
+    guard are indexed too; the n-th repeat of a key gets "#n" appended, so
+    repeated statements are matched by position.
+
+    Returns (blocks: dict, imports: list of (import source, end offset)).
+    """
+    tree = tree or ast.parse(code)
+    offsets = _line_offsets(code)
+    blocks = {}
+    imports = []
+    seen_keys = {}
+
+    def span(node):
+        first = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        return offsets[first - 1], offsets[node.end_lineno]
+
+    def visit(body, prefix, parent):
+        for node in body:
+            if isinstance(node, _BLOCK_TYPES):
+                name = f"{prefix}{node.name}"
+                start, end = span(node)
+                block = Block(name, node, start, end, parent)
+                blocks.setdefault(name, block)
+                if parent:
+                    blocks[parent].children.append(name)
+                visit(node.body, f"{name}.", name)
+            elif parent is None and isinstance(node, (ast.Import, ast.ImportFrom)):
+                start, end = span(node)
+                imports.append((code[start:end].strip(), end))
+            elif parent is None:
+                key = _statement_key(node, code)
+                if key:
+                    seen_keys[key] = seen_keys.get(key, 0) + 1
+                    if seen_keys[key] > 1:
+                        key = f"{key}#{seen_keys[key]}"
+                    start, end = span(node)
+                    blocks.setdefault(key, Block(key, node, start, end))
+
+    visit(tree.body, "", None)
+    return blocks, imports
+
 
 def parse_code_blocks(code: str):
     """
     Parses functions, classes, and imports from a Python file.
     Returns a dict {block_name: block_content}.
     """
-    blocks = {}
-    current_block = None
-    current_content = []
+    blocks, imports = index_blocks(code)
+    result = {name: code[block.start:block.end].rstrip("\n") for name, block in blocks.items()}
+    if imports:
+        result["_imports"] = "\n".join(text for text, _ in imports) + "\n"
+    return result
+
+
+def _own_source(code: str, blocks: dict, block: Block) -> str:
+    """
+    A class's source with its nested defs cut out, to tell header/attribute
+    changes apart from method changes.
+    """
+    pieces, position = [], block.start
+    for child_name in block.children:
+        child = blocks[child_name]
+        pieces.append(code[position:child.start])
+        position = child.end
+    pieces.append(code[position:block.end])
+    return "\n".join(line.rstrip() for line in "".join(pieces).splitlines() if line.strip())
+
 
-    lines = code.splitlines()
+def _indent_of(code: str, offset: int) -> str:
+    line_end = code.find("\n", offset)
+    line = code[offset:line_end if line_end != -1 else len(code)]
+    return line[:len(line) - len(line.lstrip())]
 
-    for line in lines:
-        line_strip = line.strip()
 
-        if line_strip.startswith("def ") or line_strip.startswith("class "):
-            # Save previous block
-            if current_block:
-                blocks[current_block] = "\n".join(current_content)
+def _reindent(text: str, indent: str) -> str:
+    lines = text.splitlines(keepends=True)
+    current = min((len(l) - len(l.lstrip()) for l in lines if l.strip()), default=0)
+    return "".join(indent + l[current:] if l.strip() else l for l in lines)
 
-            current_block = re.findall(r'(def|class)\s+(\w+)', line_strip)[0][1]
-            current_content = [line]
-        elif line_strip.startswith("import ") or line_strip.startswith("from "):
-            # Treat imports as part of special "_imports" block
-            blocks.setdefault("_imports", "")
-            blocks["_imports"] += line + "\n"
-        else:
-            if current_block:
-                current_content.append(line)
 
-    if current_block:
-        blocks[current_block] = "\n".join(current_content)
+def _ensure_newline(text: str) -> str:
+    return text if text.endswith("\n") else text + "\n"
 
-    return blocks
 
 def generate_patch(old_code: str, new_code: str):
     """
-    Compares old and new code blocks, and returns updated blocks.
+    Compares old and new code, and returns the edits needed to bring the
+    changed parts of new_code into old_code.
+    Returns a list of (start, end, replacement) on old_code.
     """
-    old_blocks = parse_code_blocks(old_code)
-    new_blocks = parse_code_blocks(new_code)
+    old_blocks, old_imports = index_blocks(old_code)
+    new_blocks, new_imports = index_blocks(new_code)
+    edits = []
+    appended = []
+
+    # Old methods by their short name, for snippets that send a bare method
+    methods_by_name = {}
+    for name, block in old_blocks.items():
+        if block.parent:
+            methods_by_name.setdefault(name.rsplit(".", 1)[1], []).append(block)
+
+    def source(code, block):
+        return code[block.start:block.end]
+
+    def patch_block(name):
+        new_block = new_blocks[name]
+        new_text = _ensure_newline(source(new_code, new_block))
+        old_block = old_blocks.get(name)
+
+        if old_block is None:
+            if new_block.parent is None:
+                short = methods_by_name.get(name, [])
+                if len(short) == 1:
+                    # A bare method sent without its class
+                    target = short[0]
+                    edits.append((target.start, target.end, _reindent(new_text, _indent_of(old_code, target.start))))
+                    return
+                appended.append(new_text)
+            else:
+                parent = old_blocks.get(new_block.parent)
+                if parent is not None:
+                    indent = _indent_of(old_code, parent.start) + "    "
+                    edits.append((parent.end, parent.end, "\n" + _reindent(new_text, indent)))
+            return
+
+        old_text = source(old_code, old_block)
+        if old_text.strip() == new_text.strip():
+            return
+        if new_block.children and old_block.children and \
+                _own_source(old_code, old_blocks, old_block) == _own_source(new_code, new_blocks, new_block):
+            # Only nested defs changed: patch them one by one
+            for child in new_block.children:
+                patch_block(child)
+            return
+        edits.append((old_block.start, old_block.end, _reindent(new_text, _indent_of(old_code, old_block.start))))
+
+    for name, block in new_blocks.items():
+        if block.parent is None:
+            patch_block(name)
 
-    patch_blocks = {}
+    known_imports = {text for text, _ in old_imports}
+    missing_imports = [text for text, _ in new_imports if text not in known_imports]
+    if missing_imports:
+        import_text = "\n".join(missing_imports) + "\n"
+        position = max(end for _, end in old_imports) if old_imports else 0
+        edits.append((position, position, import_text))
 
-    for block_name, new_content in new_blocks.items():
-        if block_name not in old_blocks:
-            # New function/class/import
-            patch_blocks[block_name] = new_content
-        elif old_blocks[block_name] != new_content:
-            # Changed function/class
-            patch_blocks[block_name] = new_content
+    if appended:
+        main_guard = old_blocks.get("__main__")
+        position = main_guard.start if main_guard else len(old_code)
+        text = "\n" + "\n".join(appended) + "\n"
+        if position == len(old_code) and old_code and not old_code.endswith("\n"):
+            text = "\n" + text
+        edits.append((position, position, text))
 
-    return patch_blocks
+    return edits
 
-def apply_patch(base_code: str, patch_blocks: dict):
+
+def apply_patch(base_code: str, patch: list):
     """
-    Applies updated blocks into the base code.
+    Splices edits into base_code in a single linear pass.
+    Edits are (start, end, replacement) character offsets; overlapping edits
+    keep the first one.
     """
-    lines = base_code.splitlines()
-    final_lines = []
-    inside_block = False
-    current_block_name = None
+    pieces = []
+    position = 0
+    for start, end, replacement in sorted(patch, key=lambda e: (e[0], e[1])):
+        if start < position:
+            continue  # overlaps an edit already applied
+        pieces.append(base_code[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.append(base_code[position:])
+    return "".join(pieces)
 
-    for line in lines:
-        line_strip = line.strip()
 
-        # Check for block starts
-        if line_strip.startswith("def ") or line_strip.startswith("class "):
-            block_name = re.findall(r'(def|class)\s+(\w+)', line_strip)[0][1]
-            if block_name in patch_blocks:
-                # Replace this entire block
-                final_lines.append(patch_blocks[block_name])
-                inside_block = True
-                current_block_name = block_name
-                continue
+def parse_edit_hunks(ai_response: str):
+    """
+    Parse the compact edit protocol: SEARCH/REPLACE blocks or unified diff hunks.
+    Returns a list of (search, replace) text pairs, empty if the answer has neither.
+    """
+    hunks = [(search, replace) for search, replace in _SEARCH_REPLACE.findall(ai_response)]
+    if hunks:
+        return hunks
 
-        if inside_block:
-            if line.startswith(" " * 4) or line == "":
-                continue  # skip old block lines
-            else:
-                inside_block = False  # out of block
+    search, replace, in_hunk = [], [], False
+
+    def flush():
+        if search or replace:
+            hunks.append(("".join(search), "".join(replace)))
+
+    for line in ai_response.splitlines():
+        if _HUNK_HEADER.match(line):
+            flush()
+            search, replace, in_hunk = [], [], True
+            continue
+        if not in_hunk or line.startswith(("--- ", "+++ ")):
+            continue
+        if line.startswith("```"):
+            flush()
+            search, replace, in_hunk = [], [], False
+            continue
+        marker, text = (line[:1], line[1:]) if line else (" ", "")
+        if marker == "-":
+            search.append(text + "\n")
+        elif marker == "+":
+            replace.append(text + "\n")
+        elif marker == " ":
+            search.append(text + "\n")
+            replace.append(text + "\n")
+        # anything else ("\ No newline at end of file", prose) is ignored
+    flush()
+    return hunks
+
+
+def _find_hunk(lines: list, search_lines: list):
+    """
+    Locate search_lines in lines: exactly, then ignoring whitespace, then by
+    similarity. Returns (start, end, how) or None.
+    """
+    n = len(search_lines)
+    if n == 0 or n > len(lines):
+        return None
+
+    for i in range(len(lines) - n + 1):
+        if lines[i:i + n] == search_lines:
+            return i, i + n, "exact"
+
+    stripped = [l.strip() for l in search_lines]
+    for i in range(len(lines) - n + 1):
+        if [l.strip() for l in lines[i:i + n]] == stripped:
+            return i, i + n, "whitespace"
+
+    target = "".join(stripped)
+    best, best_ratio = None, FUZZY_THRESHOLD
+    for i in range(len(lines) - n + 1):
+        window = "".join(l.strip() for l in lines[i:i + n])
+        matcher = difflib.SequenceMatcher(None, window, target, autojunk=False)
+        if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+            continue
+        ratio = matcher.ratio()
+        if ratio > best_ratio:
+            best, best_ratio = i, ratio
+    if best is not None:
+        return best, best + n, "fuzzy"
+    return None
+
+
+def apply_hunks(code: str, hunks: list, exact: bool = False):
+    """
+    Apply (search, replace) hunks in order. Hunks that cannot be located are
+    reported instead of applied; when a hunk matched with different indentation
+    the replacement is shifted by the same amount. With exact, only verbatim
+    matches count and anything else is a conflict.
+    Returns (updated_code, conflicts) where conflicts is a list of dicts.
+    """
+    lines = code.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    conflicts = []
+
+    for number, (search, replace) in enumerate(hunks, 1):
+        search_lines = search.splitlines(keepends=True)
+        replace_lines = replace.splitlines(keepends=True)
+        if not search.strip():
+            lines.extend(replace_lines)  # pure addition: append at the end
+            continue
+
+        found = _find_hunk(lines, search_lines)
+        if found is None:
+            conflicts.append({"hunk": number, "search": search, "reason": "search text not found"})
+            continue
+        start, end, how = found
+        if exact and how != "exact":
+            conflicts.append({"hunk": number, "search": search, "reason": f"search text only matched {how}"})
+            continue
+
+        if how != "exact":
+            # Map each indentation used in the search text to the one actually found
+            indents = {}
+            for actual, expected in zip(lines[start:end], search_lines):
+                if expected.strip():
+                    indents.setdefault(_indent_of(expected, 0), _indent_of(actual, 0))
+            shifted = []
+            for l in replace_lines:
+                indent = _indent_of(l, 0)
+                shifted.append(indents[indent] + l[len(indent):] if l.strip() and indent in indents else l)
+            replace_lines = shifted
+        lines[start:end] = replace_lines
+
+    return "".join(lines), conflicts
+
+
+def patch_code(base_code: str, ai_response: str, filename: str = "<patched>"):
+    """
+    Returns (updated_code, error). updated_code is None when nothing usable
+    could be produced; the result always compiles.
+    Answers in the SEARCH/REPLACE or unified diff protocol are applied as hunks;
+    anything else is treated as replacement code and merged block by block.
+    """
+    hunks = parse_edit_hunks(ai_response)
+    if hunks:
+        updated_code, conflicts = apply_hunks(base_code, hunks)
+        for conflict in conflicts:
+            print(f"⚠️ Hunk {conflict['hunk']} not applied: {conflict['reason']}")
+        if len(conflicts) == len(hunks):
+            return None, "no hunk could be applied"
+        if filename.endswith(".py"):
+            try:
+                compile(updated_code, filename, "exec")
+            except SyntaxError as e:
+                return None, f"Patched code does not compile: {e}"
+        return updated_code, None
+
+    # Snippets often keep the indentation they had inside their class;
+    # generate_patch re-indents every block to the span it replaces
+    new_code = textwrap.dedent(extract_code(ai_response))
+    try:
+        ast.parse(new_code)
+    except SyntaxError as e:
+        return None, f"AI code does not parse: {e}"
 
-        if not inside_block:
-            final_lines.append(line)
+    try:
+        ast.parse(base_code)
+    except SyntaxError:
+        # The crash is a syntax error: block matching is impossible, take the new code whole.
+        updated_code = new_code
+    else:
+        updated_code = apply_patch(base_code, generate_patch(base_code, new_code))
 
-    # Add any new blocks that were not originally there
-    for block_name, content in patch_blocks.items():
-        if block_name not in base_code:
-            final_lines.append(content)
+    try:
+        compile(updated_code, filename, "exec")
+    except SyntaxError as e:
+        return None, f"Patched code does not compile: {e}"
+    return updated_code, None
 
-    return "\n".join(final_lines)
 
 def patch_file(base_path: str, filename: str, new_code: str):
     """
     Loads base file, applies patch, saves the new file.
+    Returns True if the file was updated.
     """
     file_path = os.path.join(base_path, filename)
     if not os.path.exists(file_path):
         print(f"❌ File {filename} not found for patching.")
-        return
+        return False
 
     with open(file_path, "r", encoding="utf-8") as f:
         base_code = f.read()
 
-    patch_blocks = generate_patch(base_code, new_code)
-    updated_code = apply_patch(base_code, patch_blocks)
+    if filename.endswith(".py") or parse_edit_hunks(new_code):
+        updated_code, error = patch_code(base_code, new_code, filename)
+    else:
+        updated_code, error = extract_code(new_code), None
+    if updated_code is None:
+        print(f"❌ Could not patch {filename}: {error}")
+        return False
+    if updated_code.rstrip("\n") == base_code.rstrip("\n"):
+        print(f"⚠️ Patch for {filename} changes nothing.")
+        return False
 
-    with open(file_path, "w", encoding="utf-8") as f:
+    tmp_path = f"{file_path}.patch-tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         f.write(updated_code)
+    os.replace(tmp_path, file_path)
 
     print(f"✅ Patched {filename} successfully.")
+    return True
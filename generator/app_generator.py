@@ -1,29 +1,250 @@
 # generator/app_generator.py
 
 import os
+import shutil
+import time
+import uuid
+from generator.stream_parser import StreamingProjectParser
+from pipeline.events import emit
+
+# Write buffer per staged file
+_WRITE_BUFFER = 64 * 1024
+
+# Kinds of hidden working folder kept next to a project
+_SIBLING_KINDS = ("staging", "previous", "candidate", "fix")
+
+# Working folders in use in this process, so sweeps leave them alone
+_active_folders = set()
+
+
+def _sibling(base_path: str, kind: str) -> str:
+    """
+    Hidden working folder next to base_path: .<name>.<kind>-<pid>-<random>.
+    """
+    parent, name = os.path.split(base_path)
+    return os.path.join(parent, f".{name}.{kind}-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        return True  # no safe liveness probe; leave other processes' folders alone
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # exists but belongs to someone else
+    return True
+
+
+def scratch_folder(base_path: str, kind: str) -> str:
+    """
+    Reserve a hidden, unique working folder next to base_path (e.g. for a
+    best-of-n or fix candidate). It is not created; sweeps leave it alone
+    until release_folder().
+    """
+    path = _sibling(os.path.abspath(base_path), kind)
+    _active_folders.add(path)
+    return path
+
+
+def release_folder(path: str):
+    _active_folders.discard(path)
+
+
+def sweep_stale_siblings(base_path: str):
+    """
+    Remove working folders of base_path (staging, previous project,
+    candidates) left behind by a build that crashed or was killed.
+    """
+    parent, name = os.path.split(os.path.abspath(base_path))
+    try:
+        entries = os.listdir(parent)
+    except OSError:
+        return
+    for entry in entries:
+        for kind in _SIBLING_KINDS:
+            prefix = f".{name}.{kind}-"
+            if not entry.startswith(prefix):
+                continue
+            path = os.path.join(parent, entry)
+            pid = entry[len(prefix):].split("-", 1)[0]
+            if path in _active_folders or (pid.isdigit() and _pid_alive(int(pid)) and int(pid) != os.getpid()):
+                continue
+            print(f"🧹 Removing leftover {kind} folder {entry}")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def swap_into_place(source_path: str, base_path: str):
+    """
+    Replace base_path with the folder at source_path. The current project is
+    renamed aside, source_path renamed in, then the old one removed, so
+    base_path holds one complete project or the other, never a mix.
+    """
+    previous = None
+    if os.path.lexists(base_path):
+        previous = _sibling(base_path, "previous")
+        _active_folders.add(previous)
+        os.rename(base_path, previous)
+    try:
+        os.rename(source_path, base_path)
+    except OSError:
+        if previous:
+            os.rename(previous, base_path)
+        raise
+    finally:
+        _active_folders.discard(previous)
+    if previous:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+class ProjectWriter:
+    """
+    Writes a project into a staging folder next to base_path, then swaps it
+    into place on commit(), so base_path always holds either the previous
+    project or the complete new one, never a half-written mix. Used as a
+    context manager it commits on success and discards the staging folder
+    on any exception.
+    """
+
+    def __init__(self, base_path: str):
+        self.base_path = os.path.abspath(base_path)
+        sweep_stale_siblings(self.base_path)
+        self.staging_path = _sibling(self.base_path, "staging")
+        self.committed = False
+        self._started = time.monotonic()
+        self._file_sizes = {}
+        os.makedirs(self.staging_path)
+        _active_folders.add(self.staging_path)
+        self._created_dirs = {self.staging_path}
+
+    @property
+    def files_written(self) -> int:
+        return len(self._file_sizes)
+
+    @property
+    def bytes_written(self) -> int:
+        return sum(self._file_sizes.values())
+
+    def _make_dir(self, path: str):
+        if path in self._created_dirs:
+            return
+        os.makedirs(path, exist_ok=True)
+        # makedirs created the parents too; remember them so each directory is made once
+        while path not in self._created_dirs:
+            self._created_dirs.add(path)
+            path = os.path.dirname(path)
+
+    def write(self, relative_path: str, content: str) -> str:
+        """
+        Stage one file. Returns its full path in the staging folder, or None
+        if the path escapes the project. Writing a path again replaces it.
+        """
+        full_path = os.path.abspath(os.path.join(self.staging_path, relative_path))
+        if os.path.commonpath([self.staging_path, full_path]) != self.staging_path or full_path == self.staging_path:
+            print(f"⚠️ Skipping file outside project folder: {relative_path}")
+            return None
+
+        data = content.encode("utf-8")
+        self._make_dir(os.path.dirname(full_path))
+        with open(full_path, "wb", buffering=_WRITE_BUFFER) as f:
+            f.write(data)
+        self._file_sizes[full_path] = len(data)  # a rewritten path counts once
+        emit("file_written", path=os.path.relpath(full_path, self.staging_path), bytes=len(data))
+        return full_path
+
+    def write_tree(self, files: dict):
+        """
+        Stage a {filename_or_folder: filecontent_or_subfolder} structure.
+        """
+        pending = [("", files)]
+        while pending:
+            prefix, level = pending.pop()
+            for name, content in level.items():
+                relative_path = os.path.join(prefix, name)
+                if isinstance(content, dict):
+                    pending.append((relative_path, content))
+                elif isinstance(content, str):
+                    self.write(relative_path, content)
+                else:
+                    print(f"⚠️ Unexpected content type for {name}: {type(content)}")
+
+    def commit(self):
+        """
+        Swap the staged project into base_path and remove the previous one.
+        """
+        swap_into_place(self.staging_path, self.base_path)
+        self.committed = True
+        _active_folders.discard(self.staging_path)
+        emit("project_written", path=os.path.basename(self.base_path), files=self.files_written,
+             bytes=self.bytes_written, seconds=round(time.monotonic() - self._started, 3))
+        print(f"✅ Project created at {self.base_path} ({self.files_written} files, {self.bytes_written} bytes)")
+
+    def abort(self):
+        """
+        Discard the staged files. Does nothing after commit().
+        """
+        if not self.committed:
+            shutil.rmtree(self.staging_path, ignore_errors=True)
+            _active_folders.discard(self.staging_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
 
 def create_project_structure(base_path: str, files: dict):
     """
-    Recursively create project folders and files from a dictionary structure.
-    
+    Create project folders and files from a dictionary structure, replacing
+    whatever was at base_path in one step.
+
     Args:
         base_path (str): Path where project should be created.
         files (dict): A dictionary {filename_or_folder: filecontent_or_subfolder}.
+
+    Returns:
+        (files_written, bytes_written)
     """
-    os.makedirs(base_path, exist_ok=True)
+    with ProjectWriter(base_path) as writer:
+        writer.write_tree(files)
+    return writer.files_written, writer.bytes_written
 
-    for name, content in files.items():
-        full_path = os.path.join(base_path, name)
+def stream_project_structure(base_path: str, deltas, on_file=None, writer: ProjectWriter = None):
+    """
+    Write project files while the model is still generating them.
 
-        if isinstance(content, dict):
-            # It's a subfolder, recurse
-            create_project_structure(full_path, content)
-        elif isinstance(content, str):
-            # It's a file, create and write
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            with open(full_path, "w", encoding="utf-8") as f:
-                f.write(content)
-        else:
-            print(f"⚠️ Unexpected content type for {name}: {type(content)}")
+    Args:
+        base_path (str): Path where project should be created.
+        deltas (iterable): Stream of text pieces from the engine.
+        on_file (callable): Optional callback(relative_path, full_path) run after each file is staged.
+        writer (ProjectWriter): Stage into this writer and leave committing to the caller.
+            By default a writer for base_path is created and committed once the stream ends.
+
+    Returns:
+        (full_text, parser): the raw response and the parser holding every emitted file.
+    """
+    if writer is None:
+        with ProjectWriter(base_path) as writer:
+            return stream_project_structure(base_path, deltas, on_file, writer)
+
+    parser = StreamingProjectParser()
+    pieces = []
+
+    for delta in deltas:
+        if delta and not emit("token", text=delta):
+            print(delta, end="", flush=True)  # typing effect
+        pieces.append(delta)
+        for relative_path, content in parser.feed(delta):
+            full_path = writer.write(relative_path, content)
+            if full_path and on_file:
+                on_file(relative_path, full_path)
+    print("\n")  # After stream ends
 
-    print(f"✅ Project created at {base_path}")
+    return "".join(pieces), parser
@@ -0,0 +1,129 @@
+# generator/best_of_n.py
+
+import json
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from config import BEST_OF_N_TEMPERATURES
+from engines.ollama_engine import generate_response
+from generator.app_generator import create_project_structure, release_folder, scratch_folder, swap_into_place
+from pipeline.events import submit
+from tester.test_runner import install_requirements, project_moved, relocate_output, run_command
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _candidate_options(index: int) -> dict:
+    temperature = BEST_OF_N_TEMPERATURES[index % len(BEST_OF_N_TEMPERATURES)]
+    return {"temperature": temperature, "seed": index + 1}
+
+
+def _build_candidate(index: int, full_prompt: str, scratch_path: str, run_cmd: str, cancel: threading.Event) -> dict:
+    """
+    Generate, materialize, install and run one candidate in its own scratch folder.
+    Checks for cancellation between phases.
+    """
+    result = {"index": index, "path": scratch_path, "success": False, "message": "", "created": False}
+
+    def checkpoint():
+        if cancel.is_set():
+            raise _Cancelled()
+
+    checkpoint()
+    ai_response = generate_response(full_prompt, stream=False, options=_candidate_options(index), cache=False)
+    checkpoint()
+    try:
+        project_structure = json.loads(ai_response)
+    except json.JSONDecodeError:
+        result["message"] = "AI response is not valid JSON format."
+        return result
+
+    create_project_structure(scratch_path, project_structure)
+    result["created"] = True
+    checkpoint()
+
+    deps_success, deps_output = install_requirements(scratch_path)
+    if not deps_success:
+        result["message"] = deps_output
+        return result
+    checkpoint()
+
+    success, message = run_command(scratch_path, run_cmd)
+    result["success"], result["message"] = success, message
+    return result
+
+
+def _promote(scratch_path: str, base_path: str):
+    """
+    Replace base_path with a candidate's scratch folder.
+    """
+    swap_into_place(scratch_path, base_path)
+    project_moved(scratch_path, base_path)
+
+
+def generate_best_of_n(full_prompt: str, base_path: str, run_cmd: str, n: int):
+    """
+    Ask the engine for n candidate projects concurrently, each at its own
+    temperature/seed, and run them in parallel in hidden scratch folders next to base_path.
+    The first candidate that runs successfully is promoted to base_path and the
+    rest are cancelled. If none pass, the first candidate that produced a project
+    is promoted so the auto-fixer can work on it.
+
+    Returns (success: bool, output: str), or None if no candidate produced a project.
+    """
+    print(f"🎲 Generating {n} candidate projects in parallel...")
+    cancel = threading.Event()
+    scratch_paths = [scratch_folder(base_path, "candidate") for _ in range(n)]
+    executor = ThreadPoolExecutor(max_workers=n, thread_name_prefix="candidate")
+    futures = [
+        submit(executor, _build_candidate, i, full_prompt, scratch_paths[i], run_cmd, cancel)
+        for i in range(n)
+    ]
+
+    winner = None
+    fallback = None
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except _Cancelled:
+            continue
+        except Exception as e:
+            print(f"⚠️ Candidate failed: {e}")
+            continue
+
+        if result["success"]:
+            print(f"🏆 Candidate {result['index'] + 1} ran successfully.")
+            winner = result
+            break
+        print(f"❌ Candidate {result['index'] + 1} failed.")
+        if fallback is None and result["created"]:
+            fallback = result
+
+    cancel.set()
+    for future in futures:
+        future.cancel()
+
+    chosen = winner or fallback
+    if chosen is not None:
+        _promote(chosen["path"], base_path)
+        # It ran in the scratch folder; point the traceback at the files now in base_path
+        chosen["message"] = relocate_output(chosen["message"], chosen["path"], base_path)
+        print(f"✅ Project created at {base_path}")
+
+    # Losing candidates finish their current phase in the background, then get removed.
+    def cleanup():
+        wait(futures)
+        executor.shutdown()
+        for path in scratch_paths:
+            if chosen is None or path != chosen["path"]:
+                shutil.rmtree(path, ignore_errors=True)
+            release_folder(path)
+
+    threading.Thread(target=cleanup, name="candidate-cleanup").start()
+
+    if chosen is None:
+        print("❌ No candidate produced a valid project.")
+        return None
+    return chosen["success"], chosen["message"]
@@ -0,0 +1,144 @@
+# generator/stream_parser.py
+
+import json
+import re
+
+_STRING_STOP = re.compile(r'["\\]')
+
+
+class StreamingProjectParser:
+    """
+    Incremental parser for the project JSON returned by the model.
+
+    Feed it stream deltas as they arrive; every time a "filename": "content"
+    string closes, the (path, content) pair is returned right away instead of
+    waiting for the whole document. Nested objects are treated as folders and
+    their keys are joined into relative paths. Any text before the first '{'
+    (greetings, code fences) is skipped.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.done = False
+        self._state = "start"
+        self._path = []
+        self._key = None
+        self._raw = []
+        self._escape = False
+        self._skip_depth = 0
+        self._skip_in_string = False
+
+    def feed(self, chunk: str):
+        """
+        Consumes the next piece of model output.
+        Returns a list of (relative_path, content) pairs completed by this chunk.
+        """
+        completed = []
+        i = 0
+        n = len(chunk)
+        while i < n and not self.done:
+            state = self._state
+
+            if state in ("key", "string"):
+                i = self._scan_string(chunk, i, completed)
+                continue
+
+            if state == "skip":
+                i = self._scan_skip(chunk, i)
+                continue
+
+            ch = chunk[i]
+            i += 1
+            if ch in " \t\r\n":
+                continue
+
+            if state == "start":
+                if ch == "{":
+                    self._state = "key_or_end"
+            elif state == "key_or_end":
+                if ch == '"':
+                    self._state = "key"
+                elif ch == "}":
+                    self._close_object()
+            elif state == "colon":
+                if ch == ":":
+                    self._state = "value"
+            elif state == "value":
+                if ch == '"':
+                    self._state = "string"
+                elif ch == "{":
+                    self._path.append(self._key)
+                    self._state = "key_or_end"
+                else:
+                    # Arrays, numbers, null... are not files; skip them.
+                    self._state = "skip"
+                    self._skip_depth = 0
+                    i -= 1
+            elif state == "comma_or_end":
+                if ch == ",":
+                    self._state = "key_or_end"
+                elif ch == "}":
+                    self._close_object()
+        return completed
+
+    def _scan_string(self, chunk: str, i: int, completed: list) -> int:
+        while i < len(chunk):
+            if self._escape:
+                self._raw.append(chunk[i])
+                self._escape = False
+                i += 1
+                continue
+            match = _STRING_STOP.search(chunk, i)
+            if match is None:
+                self._raw.append(chunk[i:])
+                return len(chunk)
+            stop = match.start()
+            self._raw.append(chunk[i:stop])
+            if chunk[stop] == "\\":
+                self._raw.append("\\")
+                self._escape = True
+                i = stop + 1
+                continue
+
+            text = json.loads('"' + "".join(self._raw) + '"')
+            self._raw = []
+            if self._state == "key":
+                self._key = text
+                self._state = "colon"
+            else:
+                path = "/".join(self._path + [self._key])
+                self.files[path] = text
+                completed.append((path, text))
+                self._state = "comma_or_end"
+            return stop + 1
+        return i
+
+    def _scan_skip(self, chunk: str, i: int) -> int:
+        while i < len(chunk):
+            ch = chunk[i]
+            if self._skip_in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._skip_in_string = False
+            elif ch == '"':
+                self._skip_in_string = True
+            elif ch in "[{":
+                self._skip_depth += 1
+            elif ch in "]}" and self._skip_depth:
+                self._skip_depth -= 1
+            elif self._skip_depth == 0 and ch in ",}":
+                # Let the object-level states handle the delimiter.
+                self._state = "comma_or_end"
+                return i
+            i += 1
+        return i
+
+    def _close_object(self):
+        if self._path:
+            self._path.pop()
+            self._state = "comma_or_end"
+        else:
+            self.done = True
@@ -0,0 +1,279 @@
+# pipeline/build.py
+#
+# The build pipeline as a library: idea -> generated project -> installed
+# dependencies -> run -> auto-fix. main.py is a thin CLI over run_build();
+# the backend calls build_events() directly so every build shares this
+# process's warm engine session, caches, venv pool and fork servers.
+
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from config import AI_ENGINE, EARLY_INSTALL, BEST_OF_N, BUILD_EVENT_BUFFER
+from fixer.ai_fixer import auto_fix
+from engines.ollama_engine import generate_response as ollama_response, stream_response as ollama_stream
+from generator.app_generator import ProjectWriter, create_project_structure, stream_project_structure
+from generator.best_of_n import generate_best_of_n
+from pipeline.events import BuildCancelled, build_context, check_cancelled, install_output_routing, phase
+from tester.test_runner import install_requirements, install_requirements_in_background, project_moved, run_command
+
+# Base system prompt with placeholders for language and run command
+BASE_SYSTEM_PROMPT = """
+You are a professional coding AI. Your task is to create full apps based on user ideas.
+
+Project Language: {language}
+Run Command: {run_cmd}
+
+You must ONLY return a JSON object with the following format:
+{{
+  "filename1.ext": "file content 1",
+  "filename2.ext": "file content 2",
+  ...
+}}
+
+STRICT RULES:
+- Every file MUST have a correct extension (.py, .html, .css, .js, etc.).
+- For Python apps, you MUST include a 'requirements.txt' file listing only real pip packages (one per line, no comments).
+- You MUST use only standard escaped JSON strings.
+- You MUST NOT use triple quotes. Instead, represent multi-line text by escaping newlines using "\\n".
+- NEVER use Markdown code block formatting.
+- NO explanations, no greetings, no extra text outside the JSON object.
+- ONLY output pure machine-readable JSON.
+
+⚠️ Reminder: Represent multi-line file contents using "\\n" inside strings, without triple quotes.
+"""
+
+# Folders next to generated projects that a project name must never replace
+_RESERVED_NAMES = {"backend", "engines", "fixer", "generator", "knowledge", "pipeline", "tester", "ui",
+                   "env", "node_modules", "__pycache__", "testenv"}
+
+
+def project_path(root_dir: str, project_name: str) -> str:
+    """
+    Folder for a project under root_dir. Raises ValueError for names that
+    are empty, hidden, reserved or not a single path component.
+    """
+    name = (project_name or "").strip()
+    if (not name or name.startswith(".") or os.path.basename(name) != name
+            or os.sep in name or (os.altsep and os.altsep in name) or name in _RESERVED_NAMES):
+        raise ValueError(f"Invalid project name: {project_name!r}")
+    return os.path.join(root_dir, name)
+
+
+def determine_run_cmd(language: str) -> str:
+    if language.lower().startswith("python"):
+        return "python main.py"
+    print(f"🤖 Determining run command for {language}...")
+    cmd_prompt = f"As a shell command, how would you run a project written in {language}? Respond with only the command."
+    return ollama_response(cmd_prompt, stream=False, options={"temperature": 0}).strip().splitlines()[0]
+
+
+def _cancellable(deltas):
+    for delta in deltas:
+        check_cancelled()
+        yield delta
+
+
+def generate_and_run(full_prompt: str, base_path: str, run_cmd: str, stream_mode: bool):
+    """
+    Generates one project into base_path, installs its dependencies and runs it.
+    Returns (success: bool, output: str), or None if no runnable project was produced.
+    """
+    install_future = None
+    writer = ProjectWriter(base_path) if stream_mode else None
+
+    def on_file(relative_path, full_path):
+        nonlocal install_future
+        if EARLY_INSTALL and relative_path == "requirements.txt" and install_future is None:
+            print("\n📦 requirements.txt received, installing dependencies in the background...")
+            install_future = install_requirements_in_background(writer.staging_path)
+
+    with phase("generate"):
+        if stream_mode:
+            # Files are staged as soon as each one is complete in the stream,
+            # then the whole project replaces base_path at once
+            try:
+                try:
+                    ai_response, parser = stream_project_structure(base_path, _cancellable(ollama_stream(full_prompt)),
+                                                                   on_file=on_file, writer=writer)
+                except BuildCancelled:
+                    raise
+                except json.JSONDecodeError as e:
+                    # The model's output is malformed (e.g. a raw newline inside a file's content)
+                    print(f"❌ AI response is not valid JSON format: {e}")
+                    return
+                except Exception as e:
+                    print(f"Error communicating with Ollama: {e}")
+                    return
+                if not parser.done:
+                    try:
+                        writer.write_tree(json.loads(ai_response))
+                    except json.JSONDecodeError:
+                        if not parser.files:
+                            print("❌ AI response is not valid JSON format.")
+                            return
+                        print("⚠️ AI response JSON was incomplete; keeping the files received so far.")
+                writer.commit()
+            finally:
+                writer.abort()  # no-op once committed
+        else:
+            ai_response = ollama_response(full_prompt, stream=False)
+            if ai_response:
+                print("✅ AI Response:")
+                print(ai_response)
+                try:
+                    project_structure = json.loads(ai_response)
+                    create_project_structure(base_path, project_structure)
+                except json.JSONDecodeError:
+                    print("❌ AI response is not valid JSON format.")
+                    return
+    check_cancelled()
+
+    with phase("install"):
+        # Install dependencies via test_runner, unless already started during streaming
+        if install_future is None:
+            print("📦 Installing dependencies if any...")
+            install_future = install_requirements_in_background(base_path)
+        deps_success, deps_output = install_future.result()
+        if writer is not None:
+            project_moved(writer.staging_path, base_path)  # the early install ran in the staging folder
+        if deps_success or writer is not None:
+            # Files streamed after requirements.txt may import packages it missed, and an
+            # early install can trip over the staging folder being swapped into place;
+            # this is a no-op when the resolved set is unchanged.
+            deps_success, deps_output = install_requirements(base_path)
+        print(deps_output)
+        if not deps_success:
+            print("❌ Failed to install dependencies. Aborting.")
+            return
+    check_cancelled()
+
+    # Run the determined command
+    with phase("run"):
+        print("\n🛠️  Running project command...")
+        return run_command(base_path, run_cmd)
+
+
+def run_build(idea: str, language: str = "Python", project_name: str = "VibeApp", stream_mode: bool = True,
+              root_dir: str = None, best_of_n: int = BEST_OF_N, fix: bool = True) -> dict:
+    """
+    Build one project end to end: generate it under root_dir/project_name,
+    install its dependencies, run it and auto-fix it if it fails.
+
+    Returns {"success", "message", "base_path", "run_cmd", "fix_report"};
+    fix_report is None when no auto-fix was needed or attempted.
+    Raises BuildCancelled if the build's cancel Event was set.
+    """
+    base_path = project_path(root_dir or os.getcwd(), project_name)
+    result = {"success": False, "message": "", "base_path": base_path, "run_cmd": None, "fix_report": None}
+
+    if AI_ENGINE != "ollama":
+        result["message"] = f"AI_ENGINE '{AI_ENGINE}' not supported."
+        print(f"❌ {result['message']}")
+        return result
+
+    with phase("plan"):
+        run_cmd = result["run_cmd"] = determine_run_cmd(language)
+
+    print("\n🧠 Thinking...\n")
+    prompt_header = BASE_SYSTEM_PROMPT.format(language=language, run_cmd=run_cmd).strip()
+    full_prompt = f"{prompt_header}\n\nUser request:\n{idea}"
+
+    if best_of_n > 1:
+        with phase("generate"):
+            outcome = generate_best_of_n(full_prompt, base_path, run_cmd, best_of_n)
+    else:
+        outcome = generate_and_run(full_prompt, base_path, run_cmd, stream_mode)
+    if outcome is None:
+        result["message"] = "No runnable project was produced."
+        return result
+    success, message = outcome
+    result["success"], result["message"] = success, message
+
+    if success:
+        print("✅ Project ran successfully!")
+        return result
+    print("❌ Command failed with error:")
+    print(message)
+    if not fix:
+        return result
+    check_cancelled()
+
+    # Auto-fix loop
+    print("\n🧠 Attempting to auto-fix...\n")
+    with phase("fix"):
+        success, message, report = auto_fix(base_path, run_cmd, message)
+    iterations = report["iterations"]
+    tokens = report["usage"].get("prompt_tokens", 0) + report["usage"].get("completion_tokens", 0)
+    print(f"ℹ️ Auto-fix: {len(iterations)} iteration(s) in {report['seconds']}s, {tokens} tokens ({report['stop_reason']}).")
+    result.update(success=success, message=message, run_cmd=report["run_cmd"], fix_report=report)
+    return result
+
+
+async def build_events(idea: str, language: str = "Python", project_name: str = "VibeApp",
+                       stream_mode: bool = True, root_dir: str = None, cancel: threading.Event = None,
+                       executor=None, buffer: int = BUILD_EVENT_BUFFER, **options):
+    """
+    Run run_build() on a worker thread and yield its events (see
+    pipeline.events) as they happen, ending with one "result" event that
+    holds run_build()'s return value plus "cancelled", "error" and "stats"
+    (total seconds, token counts and per-phase durations).
+
+    At most `buffer` events wait for the consumer; beyond that the build
+    thread blocks until the consumer catches up. Runs of token events that
+    piled up are merged into one. Closing the iterator early cancels the build.
+    """
+    loop = asyncio.get_running_loop()
+    cancel = cancel or threading.Event()
+    slots = threading.Semaphore(buffer)
+    closed = threading.Event()
+    pending = deque()
+    ready = asyncio.Event()
+    install_output_routing()
+
+    def push(event):
+        pending.append(event)
+        ready.set()
+
+    def sink(event):
+        while not slots.acquire(timeout=0.5):
+            if closed.is_set():
+                return  # nobody is listening any more
+        loop.call_soon_threadsafe(push, event)
+
+    def worker():
+        result = {"success": False, "message": "", "cancelled": False, "error": None}
+        with build_context(sink, cancel) as state:
+            try:
+                result.update(run_build(idea, language, project_name, stream_mode, root_dir, **options))
+            except BuildCancelled:
+                print("🛑 Build cancelled.")
+                result["cancelled"] = True
+            except Exception as e:
+                print(f"❌ Build crashed: {e}")
+                result["error"] = str(e)
+            result["stats"] = state.stats()
+            state.flush_log()
+            state.send(dict(result, type="result"))
+        sink(None)
+
+    future = loop.run_in_executor(executor, worker)
+    try:
+        while True:
+            await ready.wait()
+            ready.clear()
+            while pending:
+                event = pending.popleft()
+                slots.release()
+                if event is None:
+                    return
+                while event["type"] == "token" and pending and pending[0] is not None and pending[0]["type"] == "token":
+                    following = pending.popleft()
+                    slots.release()
+                    event = dict(following, text=event["text"] + following["text"])
+                yield event
+    finally:
+        closed.set()
+        if not future.done():
+            cancel.set()
@@ -0,0 +1,216 @@
+# pipeline/events.py
+#
+# Typed event stream of a running build. Builds run in-process on worker
+# threads, so the build a piece of code belongs to is carried in a context
+# variable: emit() sends structured events to that build's sink, and print()
+# output is turned into "log" events instead of going to the shared
+# sys.stdout. Code that hands work to other threads must carry the context
+# along (see submit).
+#
+# Every event has "type", "seq" (1, 2, 3... per build) and "t" (monotonic
+# seconds since the build started). Types:
+#   log            text printed by the pipeline
+#   token          text delta streamed from the model
+#   phase_start    phase
+#   phase_end      phase, seconds, tokens, status
+#   file_written   path, bytes
+#   project_written path, files, bytes, seconds (generated files swapped into place)
+#   install        status ("started"/"finished"), packages, success
+#   run_result     command, success, seconds
+#   patch_applied  file, source ("model"/"memory"), success
+#   result         the build's final outcome (see pipeline.build)
+
+import contextvars
+import itertools
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+_state = contextvars.ContextVar("build_state", default=None)
+
+
+class BuildCancelled(Exception):
+    pass
+
+
+class BuildState:
+    """
+    Per-build bookkeeping shared by every thread working on the build.
+    """
+
+    def __init__(self, sink, cancel: threading.Event = None):
+        self.sink = sink
+        self.cancel = cancel
+        self.started = time.monotonic()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.phases = []
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._log_buffer = ""
+        self._log_lock = threading.Lock()
+
+    def send(self, event: dict):
+        # Held while delivering so seq order is delivery order
+        with self._lock:
+            event["seq"] = next(self._seq)
+            event["t"] = round(time.monotonic() - self.started, 4)
+            self.sink(event)
+
+    def write_log(self, text: str):
+        """
+        Buffer printed text and send it as "log" events of whole lines.
+        """
+        with self._log_lock:
+            self._log_buffer += text
+            cut = self._log_buffer.rfind("\n") + 1
+            if not cut:
+                return
+            text, self._log_buffer = self._log_buffer[:cut], self._log_buffer[cut:]
+        self.send({"type": "log", "text": text})
+
+    def flush_log(self):
+        with self._log_lock:
+            text, self._log_buffer = self._log_buffer, ""
+        if text:
+            self.send({"type": "log", "text": text})
+
+    def add_tokens(self, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def stats(self) -> dict:
+        return {
+            "seconds": round(time.monotonic() - self.started, 3),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "phases": list(self.phases),
+        }
+
+
+class _RoutedStream:
+    """
+    Stand-in for sys.stdout/sys.stderr that turns text into "log" events of
+    the current build, and writes to the real stream when no build is
+    running in this context.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text: str):
+        state = _state.get()
+        if state is None:
+            return self._stream.write(text)
+        state.write_log(text)
+        return len(text)
+
+    def flush(self):
+        state = _state.get()
+        if state is None:
+            self._stream.flush()
+        else:
+            state.flush_log()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def install_output_routing():
+    """
+    Route stdout and stderr through the current build's sink. Idempotent.
+    """
+    if not isinstance(sys.stdout, _RoutedStream):
+        sys.stdout = _RoutedStream(sys.stdout)
+    if not isinstance(sys.stderr, _RoutedStream):
+        sys.stderr = _RoutedStream(sys.stderr)
+
+
+@contextmanager
+def build_context(sink, cancel: threading.Event = None):
+    """
+    Run the block as one build: events go to sink(event) and
+    check_cancelled() raises once the cancel Event is set.
+    Yields the BuildState.
+    """
+    state = BuildState(sink, cancel)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def emit(event_type: str, **data) -> bool:
+    """
+    Send a structured event to the current build.
+    Returns False when no build is listening (e.g. in the CLI).
+    """
+    state = _state.get()
+    if state is None:
+        return False
+    state.flush_log()  # keep printed text in order with the event
+    state.send(dict(data, type=event_type))
+    return True
+
+
+def add_tokens(prompt_tokens: int, completion_tokens: int):
+    """
+    Count model tokens towards the current build and phase.
+    """
+    state = _state.get()
+    if state is not None:
+        state.add_tokens(prompt_tokens, completion_tokens)
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Mark the block as a build phase: emits phase_start/phase_end and records
+    its duration and token count in the build's stats.
+    """
+    state = _state.get()
+    if state is None:
+        yield
+        return
+
+    started = time.monotonic()
+    tokens_before = state.tokens()
+    status = "ok"
+    emit("phase_start", phase=name)
+    try:
+        yield
+    except BuildCancelled:
+        status = "cancelled"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        record = {
+            "phase": name,
+            "seconds": round(time.monotonic() - started, 3),
+            "tokens": state.tokens() - tokens_before,
+            "status": status,
+        }
+        state.phases.append(record)
+        emit("phase_end", **record)
+
+
+def check_cancelled():
+    state = _state.get()
+    if state is not None and state.cancel is not None and state.cancel.is_set():
+        raise BuildCancelled()
+
+
+def submit(executor, fn, *args, **kwargs):
+    """
+    executor.submit() that runs fn in a copy of the caller's context, so the
+    work still reports to the same build.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -0,0 +1,101 @@
+# pipeline/stage_limits.py
+#
+# Concurrency limits for the expensive build stages: LLM calls, dependency
+# installs and app runs. A slot is a lock file held with flock, so a limit
+# holds across every build process on the machine, and a killed build gives
+# its slots back automatically.
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from config import STAGE_LIMITS, STAGE_SLOT_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process limits only
+    fcntl = None
+
+_POLL_MIN = 0.01
+_POLL_MAX = 0.5
+
+_semaphores = {}
+_semaphores_guard = threading.Lock()
+
+
+def _try_acquire(stage: str, limit: int):
+    """
+    Returns a release callable for a free slot of stage, or None if all are taken.
+    """
+    if fcntl is None:
+        with _semaphores_guard:
+            semaphore = _semaphores.setdefault(stage, threading.BoundedSemaphore(limit))
+        return semaphore.release if semaphore.acquire(blocking=False) else None
+
+    os.makedirs(STAGE_SLOT_DIR, exist_ok=True)
+    for slot in range(limit):
+        lock_file = open(os.path.join(STAGE_SLOT_DIR, f"{stage}-{slot}.lock"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            continue
+
+        def release(lock_file=lock_file):
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+        return release
+    return None
+
+
+@contextmanager
+def stage_slot(stage: str):
+    """
+    Hold one of STAGE_LIMITS[stage] slots for the duration of the block.
+    Stages without a limit run immediately.
+    """
+    limit = STAGE_LIMITS.get(stage)
+    if not limit:
+        yield
+        return
+
+    release = _try_acquire(stage, limit)
+    if release is None:
+        print(f"⏳ Waiting for a free {stage} slot...")
+        delay = _POLL_MIN
+        while release is None:
+            time.sleep(delay)
+            delay = min(delay * 2, _POLL_MAX)
+            release = _try_acquire(stage, limit)
+    try:
+        yield
+    finally:
+        release()
+
+
+class async_stage_slot:
+    """
+    `async with` counterpart of stage_slot that waits without blocking the event loop.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._release = None
+
+    async def __aenter__(self):
+        limit = STAGE_LIMITS.get(self.stage)
+        if not limit:
+            return
+        self._release = _try_acquire(self.stage, limit)
+        delay = _POLL_MIN
+        while self._release is None:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _POLL_MAX)
+            self._release = _try_acquire(self.stage, limit)
+
+    async def __aexit__(self, *exc_info):
+        if self._release is not None:
+            self._release()
+            self._release = None
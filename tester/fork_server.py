@@ -0,0 +1,336 @@
+# tester/fork_server.py
+#
+# Warm interpreter that forks one child per app run.
+#
+# The server half of this file runs as a standalone script under the
+# project's interpreter (`python fork_server.py <socket> <parent_pid> [modules...]`),
+# so it must only import the standard library at module level.
+
+import json
+import os
+import runpy
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+_IDLE_POLL = 1.0
+
+
+def _exit_code(status: int) -> int:
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return 1
+
+
+def _recv_all(conn) -> bytes:
+    chunks = []
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _is_runner_frame(filename: str) -> bool:
+    return filename in (os.path.abspath(__file__), runpy.__file__, "<frozen runpy>")
+
+
+def _run_app(request: dict, stdin_fd: int, stdout_fd: int, stderr_fd: int):
+    """
+    Grandchild: becomes the app process. Never returns.
+    """
+    import atexit
+    import signal
+    import traceback
+
+    os.setsid()  # own process group, so a timeout can kill everything it spawned
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    os.dup2(stdin_fd, 0)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+
+    code = 0
+    try:
+        cwd = request["cwd"]
+        os.chdir(cwd)
+        os.environ.update(request.get("env") or {})
+        sys.argv = list(request["argv"])
+        sys.path.insert(0, cwd)
+        runpy.run_path(sys.argv[0], run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        # Hide the runner's own frames so the traceback looks like `python main.py`
+        etype, value, tb = sys.exc_info()
+        while tb is not None and _is_runner_frame(tb.tb_frame.f_code.co_filename):
+            tb = tb.tb_next
+        traceback.print_exception(etype, value, tb)
+        code = 1
+    try:
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(code)
+
+
+def _handle(conn):
+    """
+    Handler child: runs one request in a fresh grandchild and reports back.
+    """
+    import signal
+
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    request = json.loads(_recv_all(conn).decode("utf-8"))
+
+    stdin_file = tempfile.TemporaryFile()
+    stdin_file.write((request.get("stdin") or "").encode("utf-8"))
+    stdin_file.seek(0)
+    stdout_file = tempfile.TemporaryFile()
+    stderr_file = tempfile.TemporaryFile()
+
+    started = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        conn.close()
+        _run_app(request, stdin_file.fileno(), stdout_file.fileno(), stderr_file.fileno())
+
+    timeout = request.get("timeout")
+    deadline = started + timeout if timeout else None
+    timed_out = False
+    delay = 0.001
+    while True:
+        done_pid, status = os.waitpid(pid, os.WNOHANG)
+        if done_pid:
+            break
+        if deadline and time.monotonic() >= deadline:
+            timed_out = True
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError:
+                pass
+            _, status = os.waitpid(pid, 0)
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+    stdout_file.seek(0)
+    stderr_file.seek(0)
+    response = {
+        "returncode": _exit_code(status),
+        "stdout": stdout_file.read().decode("utf-8", "replace"),
+        "stderr": stderr_file.read().decode("utf-8", "replace"),
+        "timed_out": timed_out,
+        "duration": time.monotonic() - started,
+    }
+    conn.sendall(json.dumps(response).encode("utf-8"))
+    conn.close()
+
+
+def serve(socket_path: str, parent_pid: int, warm_modules: list):
+    """
+    Server loop: import warm_modules once, then fork a handler per connection.
+    Exits when the parent process goes away.
+    """
+    import importlib
+    import signal
+
+    for module in warm_modules:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            pass
+
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # reap handler children automatically
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path + ".tmp")
+    server.listen(64)
+    os.rename(socket_path + ".tmp", socket_path)  # clients only see a listening socket
+    server.settimeout(_IDLE_POLL)
+
+    while True:
+        try:
+            conn, _ = server.accept()
+        except socket.timeout:
+            if os.getppid() != parent_pid:
+                break
+            continue
+        conn.settimeout(None)
+        pid = os.fork()
+        if pid == 0:
+            server.close()
+            try:
+                _handle(conn)
+            finally:
+                os._exit(0)
+        conn.close()
+
+    server.close()
+    try:
+        os.unlink(socket_path)
+    except OSError:
+        pass
+
+
+def is_supported() -> bool:
+    return hasattr(os, "fork") and hasattr(socket, "AF_UNIX")
+
+
+class ForkServer:
+    """
+    Client handle for one warm interpreter.
+    """
+
+    def __init__(self, python: str, warm_modules: list):
+        self.python = python
+        self.warm_modules = warm_modules
+        self.process = None
+        self.socket_path = None
+        self.running = 0  # runs in progress; a busy server is never stopped to make room
+
+    def start(self, startup_timeout: float = 30.0) -> bool:
+        directory = tempfile.mkdtemp(prefix="vibe-fork-")
+        self.socket_path = os.path.join(directory, "server.sock")
+        self.process = subprocess.Popen(
+            [self.python, os.path.abspath(__file__), self.socket_path, str(os.getpid())] + self.warm_modules,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + startup_timeout
+        while time.monotonic() < deadline:
+            if os.path.exists(self.socket_path):
+                return True
+            if self.process.poll() is not None:
+                return False
+            time.sleep(0.01)
+        self.stop()
+        return False
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def run(self, cwd: str, argv: list, stdin: str = None, timeout: float = None, env: dict = None) -> dict:
+        """
+        Runs argv[0] as __main__ in a forked child of the warm interpreter.
+        Returns {"returncode", "stdout", "stderr", "timed_out", "duration"}.
+        Raises OSError only if the request never reached the server; once it
+        has, the app may be running, so failures are reported in the result
+        instead of inviting the caller to run it a second time.
+        """
+        request = {"cwd": cwd, "argv": argv, "stdin": stdin, "timeout": timeout, "env": env}
+        started = time.monotonic()
+        with _servers_lock:
+            self.running += 1
+        try:
+            return self._run(request, timeout, started)
+        finally:
+            with _servers_lock:
+                self.running -= 1
+
+    def _run(self, request: dict, timeout: float, started: float) -> dict:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(timeout + 30 if timeout else None)
+            conn.connect(self.socket_path)
+            conn.sendall(json.dumps(request).encode("utf-8"))
+            conn.shutdown(socket.SHUT_WR)
+            try:
+                return json.loads(_recv_all(conn).decode("utf-8"))
+            except socket.timeout:
+                # The server missed its own deadline; it is wedged, so replace it next time
+                self.stop()
+                return {"returncode": None, "stdout": "", "stderr": "", "timed_out": True,
+                        "duration": time.monotonic() - started}
+            except (OSError, ValueError) as e:
+                return {"returncode": None, "stdout": "", "stderr": f"Warm interpreter failed mid-run: {e}",
+                        "timed_out": False, "duration": time.monotonic() - started}
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.socket_path:
+            try:
+                os.unlink(self.socket_path)
+                os.rmdir(os.path.dirname(self.socket_path))
+            except OSError:
+                pass
+
+
+_servers = OrderedDict()  # python -> ForkServer, least recently used first
+_servers_lock = threading.Lock()
+_start_locks = {}
+
+
+def get_fork_server(python: str):
+    """
+    Returns a running fork server for this interpreter, starting one if needed.
+    Returns None when forking is unsupported or the server fails to start.
+    Only runs for the same interpreter wait on a cold start; beyond
+    FORK_SERVER_MAX servers the least recently used idle one is stopped.
+    """
+    from config import FORK_SERVER_WARM_MODULES, FORK_SERVER_MAX
+
+    if not is_supported():
+        return None
+    with _servers_lock:
+        start_lock = _start_locks.setdefault(python, threading.Lock())
+    with start_lock:
+        with _servers_lock:
+            server = _servers.get(python)
+            if server is not None and server.alive():
+                _servers.move_to_end(python)
+                return server
+            _servers.pop(python, None)
+
+        server = ForkServer(python, FORK_SERVER_WARM_MODULES)
+        if not server.start():
+            print(f"⚠️ Could not start warm interpreter for {python}; falling back to subprocesses.")
+            return None
+
+        with _servers_lock:
+            _servers[python] = server
+            idle = [name for name, other in _servers.items() if other is not server and not other.running]
+            retired = [_servers.pop(name) for name in idle[:max(len(_servers) - FORK_SERVER_MAX, 0)]]
+    for old in retired:
+        old.stop()
+    return server
+
+
+def stop_server(python: str):
+    """
+    Stop the warm interpreter of python, e.g. because its environment is being deleted.
+    """
+    with _servers_lock:
+        server = _servers.pop(python, None)
+    if server is not None:
+        server.stop()
+
+
+def stop_all():
+    with _servers_lock:
+        servers = list(_servers.values())
+        _servers.clear()
+    for server in servers:
+        server.stop()
+
+
+if __name__ == "__main__":
+    sys.path.pop(0)  # the tester/ folder must not shadow the app's modules
+    serve(sys.argv[1], int(sys.argv[2]), sys.argv[3:])
@@ -33,7 +33,7 @@ Example:
 42
     """.strip()
 
-    fake_inputs = generate_response(system_prompt, stream=False)
+    fake_inputs = generate_response(system_prompt, stream=False, options={"temperature": 0})
 
     # Cleanup just in case
     return fake_inputs.strip()
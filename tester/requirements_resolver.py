@@ -0,0 +1,200 @@
+# tester/requirements_resolver.py
+
+import ast
+import os
+import re
+import sys
+
+# Full list of standard library modules of the running interpreter (3.10+),
+# with a fallback for older interpreters.
+if hasattr(sys, "stdlib_module_names"):
+    STDLIB_MODULES = set(sys.stdlib_module_names)
+else:
+    STDLIB_MODULES = {
+        "__future__", "_thread", "abc", "aifc", "argparse", "array", "ast", "asynchat", "asyncio",
+        "asyncore", "atexit", "audioop", "base64", "bdb", "binascii", "binhex", "bisect", "builtins",
+        "bz2", "calendar", "cgi", "cgitb", "chunk", "cmath", "cmd", "code", "codecs", "codeop",
+        "collections", "colorsys", "compileall", "concurrent", "configparser", "contextlib",
+        "contextvars", "copy", "copyreg", "cProfile", "crypt", "csv", "ctypes", "curses", "dataclasses",
+        "datetime", "dbm", "decimal", "difflib", "dis", "distutils", "doctest", "email", "encodings",
+        "ensurepip", "enum", "errno", "faulthandler", "fcntl", "filecmp", "fileinput", "fnmatch",
+        "fractions", "ftplib", "functools", "gc", "getopt", "getpass", "gettext", "glob", "graphlib",
+        "grp", "gzip", "hashlib", "heapq", "hmac", "html", "http", "idlelib", "imaplib", "imghdr", "imp",
+        "importlib", "inspect", "io", "ipaddress", "itertools", "json", "keyword", "lib2to3", "linecache",
+        "locale", "logging", "lzma", "mailbox", "mailcap", "marshal", "math", "mimetypes", "mmap",
+        "modulefinder", "msilib", "msvcrt", "multiprocessing", "netrc", "nis", "nntplib", "ntpath",
+        "numbers", "opcode", "operator", "optparse", "os", "ossaudiodev", "pathlib", "pdb", "pickle",
+        "pickletools", "pipes", "pkgutil", "platform", "plistlib", "poplib", "posix", "posixpath",
+        "pprint", "profile", "pstats", "pty", "pwd", "py_compile", "pyclbr", "pydoc", "queue", "quopri",
+        "random", "re", "readline", "reprlib", "resource", "rlcompleter", "runpy", "sched", "secrets",
+        "select", "selectors", "shelve", "shlex", "shutil", "signal", "site", "smtpd", "smtplib",
+        "sndhdr", "socket", "socketserver", "spwd", "sqlite3", "sre_compile", "sre_constants",
+        "sre_parse", "ssl", "stat", "statistics", "string", "stringprep", "struct", "subprocess",
+        "sunau", "symtable", "sys", "sysconfig", "syslog", "tabnanny", "tarfile", "telnetlib",
+        "tempfile", "termios", "textwrap", "threading", "time", "timeit", "tkinter", "token",
+        "tokenize", "trace", "traceback", "tracemalloc", "tty", "turtle", "turtledemo", "types",
+        "typing", "unicodedata", "unittest", "urllib", "uu", "uuid", "venv", "warnings", "wave",
+        "weakref", "webbrowser", "winreg", "winsound", "wsgiref", "xdrlib", "xml", "xmlrpc",
+        "zipapp", "zipfile", "zipimport", "zlib", "zoneinfo",
+    }
+STDLIB_MODULES |= set(sys.builtin_module_names)
+STDLIB_MODULES_LOWER = {name.lower() for name in STDLIB_MODULES}
+
+# Import names whose distribution on PyPI is named differently
+IMPORT_TO_DIST = {
+    "attr": "attrs",
+    "bs4": "beautifulsoup4",
+    "Crypto": "pycryptodome",
+    "cv2": "opencv-python",
+    "dateutil": "python-dateutil",
+    "discord": "discord.py",
+    "docx": "python-docx",
+    "dotenv": "python-dotenv",
+    "fitz": "PyMuPDF",
+    "git": "GitPython",
+    "jose": "python-jose",
+    "jwt": "PyJWT",
+    "Levenshtein": "python-Levenshtein",
+    "magic": "python-magic",
+    "multipart": "python-multipart",
+    "MySQLdb": "mysqlclient",
+    "OpenSSL": "pyOpenSSL",
+    "PIL": "Pillow",
+    "pptx": "python-pptx",
+    "psycopg2": "psycopg2-binary",
+    "serial": "pyserial",
+    "skimage": "scikit-image",
+    "sklearn": "scikit-learn",
+    "slugify": "python-slugify",
+    "socketio": "python-socketio",
+    "telegram": "python-telegram-bot",
+    "usb": "pyusb",
+    "websocket": "websocket-client",
+    "win32api": "pywin32",
+    "yaml": "PyYAML",
+    "zmq": "pyzmq",
+}
+_IMPORT_TO_DIST_LOWER = {name.lower(): dist for name, dist in IMPORT_TO_DIST.items()}
+
+# Directories never scanned for imports
+_SKIP_DIRS = {"__pycache__", "env", "venv", ".venv", "node_modules", "site-packages"}
+
+_REQUIREMENT_NAME = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)(.*)$")
+
+
+def canonical_name(name: str) -> str:
+    """
+    PEP 503 normalized project name.
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def is_stdlib(module: str) -> bool:
+    return module.split(".")[0].lower() in STDLIB_MODULES_LOWER
+
+
+def dist_for_import(module: str) -> str:
+    """
+    Distribution that provides a top-level import name.
+    """
+    top = module.split(".")[0]
+    return _IMPORT_TO_DIST_LOWER.get(top.lower(), top)
+
+
+def _python_files(base_path: str):
+    for root, dirs, files in os.walk(base_path):
+        dirs[:] = [d for d in dirs if d not in _SKIP_DIRS and not d.startswith(".")]
+        for name in files:
+            if name.endswith(".py"):
+                yield os.path.join(root, name)
+
+
+def local_modules(base_path: str) -> set:
+    """
+    Top-level names importable from the project itself (modules and packages).
+    """
+    names = set()
+    for root, dirs, files in os.walk(base_path):
+        dirs[:] = [d for d in dirs if d not in _SKIP_DIRS and not d.startswith(".")]
+        for name in files:
+            if name.endswith(".py"):
+                names.add(name[:-3])
+        for name in dirs:
+            names.add(name)
+    return names
+
+
+def scan_imports(base_path: str) -> set:
+    """
+    Top-level module names imported by the project's Python files (absolute imports only).
+    Files that do not parse are skipped.
+    """
+    imports = set()
+    for path in _python_files(base_path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError, ValueError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                imports.update(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                imports.add(node.module.split(".")[0])
+    return imports
+
+
+def resolve_requirements(lines: list, base_path: str = None, infer: bool = True):
+    """
+    Normalize requirement lines before pip ever sees them.
+
+    - Comments, blank lines and pip options are dropped.
+    - Standard library modules (sqlite3, tkinter, collections...) are dropped.
+    - Import names are mapped to distributions (cv2 -> opencv-python, PIL -> Pillow).
+    - With infer, third-party imports found in base_path that no requirement covers are added.
+
+    Returns (packages, dropped, added).
+    """
+    packages, dropped, added = [], [], []
+    seen = set()
+
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith("-"):
+            # pip options (-r, -e, --index-url...) are not trusted from generated code
+            dropped.append(line)
+            continue
+
+        match = _REQUIREMENT_NAME.match(line.replace(" ", ""))
+        if not match:
+            dropped.append(line)
+            continue
+        name, spec = match.group(1), match.group(2)
+
+        if is_stdlib(name):
+            dropped.append(line)
+            continue
+
+        dist = dist_for_import(name)
+        key = canonical_name(dist)
+        if key in seen:
+            continue
+        seen.add(key)
+        packages.append(dist + spec)
+
+    if infer and base_path:
+        local = local_modules(base_path)
+        for module in sorted(scan_imports(base_path)):
+            if is_stdlib(module) or module in local:
+                continue
+            dist = dist_for_import(module)
+            key = canonical_name(dist)
+            if key in seen:
+                continue
+            seen.add(key)
+            packages.append(dist)
+            added.append(dist)
+
+    return packages, dropped, added
@@ -2,47 +2,151 @@
 
 import subprocess
 import os
+import shlex
 import sys
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from config import INSTALL_WORKERS, USE_VENV_POOL, INFER_REQUIREMENTS, USE_FORK_SERVER, RUN_TIMEOUT
+from pipeline.events import emit, submit
+from pipeline.stage_limits import stage_slot
+from tester import venv_pool
+from tester.fork_server import get_fork_server
+from tester.wheelhouse import pip_install
+from tester.requirements_resolver import resolve_requirements
 from tester.input_feeder import count_inputs_and_prompts, generate_fake_inputs
 
+_install_executor = ThreadPoolExecutor(max_workers=INSTALL_WORKERS, thread_name_prefix="install")
+
+# Last requirement set installed per project folder
+_installed_sets = {}
+
+
+def read_requirements(base_path: str, verbose: bool = False):
+    """
+    Returns the installable packages for the project, or None if there is
+    nothing to resolve (no requirements.txt and nothing inferred).
+    Standard library entries are dropped, import names are mapped to
+    distributions, and missing third-party imports are added.
+    """
+    requirements_path = os.path.join(base_path, "requirements.txt")
+    has_file = os.path.exists(requirements_path)
+    if not has_file and not INFER_REQUIREMENTS:
+        return None
+
+    lines = []
+    if has_file:
+        with open(requirements_path, "r") as f:
+            lines = [line.strip() for line in f if line.strip()]
+
+    packages, dropped, added = resolve_requirements(lines, base_path, infer=INFER_REQUIREMENTS)
+    if verbose and dropped:
+        print(f"ℹ️ Skipping standard library or invalid entries: {', '.join(dropped)}")
+    if verbose and added:
+        print(f"ℹ️ Adding packages imported by the code but missing from requirements.txt: {', '.join(added)}")
+
+    if not has_file and not packages:
+        return None
+    return packages
+
 
 def install_requirements(base_path: str):
     """
     Install dependencies from requirements.txt if it exists.
-    Skips known standard libraries.
+    A requirement set identical to the last one installed for this project is skipped.
+    With USE_VENV_POOL the packages go into a pooled virtualenv keyed by the
+    requirement set, otherwise into the current interpreter.
+    Returns (success: bool, output: str).
     """
-    requirements_path = os.path.join(base_path, "requirements.txt")
-    if os.path.exists(requirements_path):
-        print("📦 Installing dependencies from requirements.txt...")
-        try:
-            with open(requirements_path, "r") as f:
-                packages = [line.strip() for line in f if line.strip()]
-            
-            # List of standard libraries to skip
-            standard_libs = {"math", "sys", "os", "json", "re", "datetime", "time", "random", "typing", "subprocess"}
-
-            install_packages = [pkg for pkg in packages if pkg.split("==")[0] not in standard_libs]
-
-            if install_packages:
-                result = subprocess.run(
-                    [sys.executable, "-m", "pip", "install"] + install_packages,
-                    cwd=base_path,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    timeout=120
-                )
-                if result.returncode == 0:
-                    print("✅ Dependencies installed successfully.")
-                else:
-                    print("❌ Failed to install dependencies.")
-                    print(result.stderr.decode())
-            else:
-                print("ℹ️ No external dependencies to install.")
+    try:
+        install_packages = read_requirements(base_path, verbose=True)
+    except Exception as e:
+        print(f"❌ Error installing dependencies: {e}")
+        return False, str(e)
 
-        except Exception as e:
-            print(f"❌ Error installing dependencies: {e}")
-    else:
+    if install_packages is None:
         print("ℹ️ No requirements.txt found. Skipping dependency installation.")
+        return True, ""
+
+    if _installed_sets.get(base_path) == install_packages:
+        print("ℹ️ Dependencies already installed.")
+        return True, ""
+
+    print("📦 Installing dependencies from requirements.txt...")
+    if not install_packages:
+        print("ℹ️ No external dependencies to install.")
+        return True, ""
+
+    try:
+        emit("install", status="started", packages=install_packages)
+        with stage_slot("install"):
+            if USE_VENV_POOL:
+                success, _, output = venv_pool.acquire_env(install_packages)
+            else:
+                success, output = pip_install(install_packages, cwd=base_path)
+        emit("install", status="finished", packages=install_packages, success=success)
+
+        if success:
+            print("✅ Dependencies installed successfully.")
+            _installed_sets[base_path] = install_packages
+        else:
+            print("❌ Failed to install dependencies.")
+        return success, output
+
+    except Exception as e:
+        print(f"❌ Error installing dependencies: {e}")
+        return False, str(e)
+
+
+def project_moved(old_path: str, new_path: str):
+    """
+    Carry install bookkeeping over to a project folder's new location.
+    """
+    if old_path in _installed_sets:
+        _installed_sets[new_path] = _installed_sets.pop(old_path)
+
+
+def relocate_output(output: str, old_path: str, new_path: str) -> str:
+    """
+    Rewrite paths into old_path in a run's output (e.g. traceback frames of
+    a scratch copy) to point into new_path, where the project now lives.
+    """
+    new = os.path.abspath(new_path) + os.sep
+    for old in {os.path.realpath(old_path), os.path.abspath(old_path)}:
+        output = output.replace(old + os.sep, new)
+    return output
+
+
+@contextmanager
+def project_runtime(base_path: str):
+    """
+    Yields (python, env_vars) for running this project: its pooled
+    virtualenv, or the current interpreter (env_vars None = inherit).
+    The pooled environment is leased for the block, so another build's
+    eviction cannot delete it while the app runs.
+    """
+    install_packages = None
+    if USE_VENV_POOL:
+        try:
+            install_packages = read_requirements(base_path)
+        except OSError:
+            pass
+    if not install_packages:
+        yield sys.executable, None
+        return
+    with venv_pool.leased_env(install_packages) as env_dir:
+        if env_dir is None:
+            yield sys.executable, None
+        else:
+            yield venv_pool.env_python(env_dir), venv_pool.env_vars(env_dir)
+
+
+def install_requirements_in_background(base_path: str) -> Future:
+    """
+    Start install_requirements on a worker thread so it overlaps with generation.
+    Returns a Future resolving to (success: bool, output: str).
+    """
+    return submit(_install_executor, install_requirements, base_path)
 
 
 def run_python_app(base_path: str) -> (bool, str):
@@ -84,31 +188,90 @@ def run_python_app(base_path: str) -> (bool, str):
 
 
     # Step 4: Try running the app
+    timeout = 20 if fake_input_data else 15
     try:
-        if fake_input_data:
-            result = subprocess.run(
-                [sys.executable, main_file],
-                cwd=base_path,
-                input=fake_input_data.encode('utf-8'),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=20
-            )
-        else:
-            result = subprocess.run(
-                [sys.executable, main_file],
-                cwd=base_path,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=15
-            )
-
-        if result.returncode == 0:
-            return True, "App ran successfully."
-        else:
-            return False, result.stderr.decode()
-
-    except subprocess.TimeoutExpired:
-        return False, "App timed out. Possible infinite loop or wrong input."
+        with project_runtime(base_path) as (python, _):
+            returncode, _, stderr, timed_out = run_python(base_path, python, [main_file], fake_input_data, timeout)
     except Exception as e:
         return False, str(e)
+
+    if timed_out:
+        return False, "App timed out. Possible infinite loop or wrong input."
+    if returncode == 0:
+        return True, "App ran successfully."
+    return False, stderr
+
+
+def run_python(base_path: str, python: str, argv: list, stdin: str = None, timeout: float = None):
+    """
+    Run a Python script of the project, through a warm fork server when possible.
+    Returns (returncode, stdout, stderr, timed_out).
+    """
+    with stage_slot("run"):
+        return _run_python(base_path, python, argv, stdin, timeout)
+
+
+def _run_python(base_path: str, python: str, argv: list, stdin: str, timeout: float):
+    server = get_fork_server(python) if USE_FORK_SERVER else None
+    if server is not None:
+        try:
+            result = server.run(base_path, argv, stdin=stdin, timeout=timeout)
+            return result["returncode"], result["stdout"], result["stderr"], result["timed_out"]
+        except OSError as e:
+            # The server never got the request, so the app has not run yet
+            print(f"⚠️ Warm interpreter failed ({e}); running in a new process.")
+
+    try:
+        result = subprocess.run(
+            [python] + argv,
+            cwd=base_path,
+            input=stdin.encode('utf-8') if stdin else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout
+        )
+    except subprocess.TimeoutExpired as e:
+        return None, (e.stdout or b"").decode(errors="replace"), (e.stderr or b"").decode(errors="replace"), True
+    return result.returncode, result.stdout.decode(errors="replace"), result.stderr.decode(errors="replace"), False
+
+
+def run_command(base_path: str, command: str, timeout: float = RUN_TIMEOUT):
+    """
+    Executes the given shell command in the project directory,
+    inside the project's pooled virtualenv when it has one.
+    Plain `python script.py ...` commands run on a warm fork server instead of a shell.
+    Returns (success: bool, output: str).
+    """
+    started = time.monotonic()
+    success, output = _run_command(base_path, command, timeout)
+    emit("run_result", command=command, success=success, seconds=round(time.monotonic() - started, 3))
+    return success, output
+
+
+def _run_command(base_path: str, command: str, timeout: float):
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        argv = []
+
+    if len(argv) >= 2 and argv[0] in ("python", "python3") and argv[1].endswith(".py"):
+        with project_runtime(base_path) as (python, _):
+            returncode, stdout, stderr, timed_out = run_python(base_path, python, argv[1:], timeout=timeout)
+    else:
+        try:
+            with project_runtime(base_path) as (_, env), stage_slot("run"):
+                result = subprocess.run(command, shell=True, cwd=base_path, capture_output=True, text=True,
+                                        env=env, timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            return False, f"{_text(e.stdout)}{_text(e.stderr)}\nCommand timed out after {timeout} seconds."
+        return (result.returncode == 0, result.stdout + result.stderr)
+
+    if timed_out:
+        return False, f"{stdout}{stderr}\nCommand timed out after {timeout} seconds."
+    return (returncode == 0, stdout + stderr)
+
+
+def _text(output) -> str:
+    if output is None:
+        return ""
+    return output.decode(errors="replace") if isinstance(output, bytes) else output
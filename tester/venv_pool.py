@@ -0,0 +1,280 @@
+# tester/venv_pool.py
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from config import VENV_POOL_DIR, VENV_POOL_MAX_BYTES
+from tester.fork_server import stop_server
+from tester.wheelhouse import pip_install
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+READY_MARKER = ".vibe-ready"
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+# In-process lease counts, used where flock is unavailable
+_lease_counts = {}
+
+
+def normalize_requirement(requirement: str) -> str:
+    """
+    Canonical form of one requirement line: PEP 503 name, no spaces, lowercased.
+    """
+    requirement = requirement.split("#", 1)[0].strip().replace(" ", "")
+    match = re.match(r"^([A-Za-z0-9][A-Za-z0-9._-]*)(.*)$", requirement)
+    if not match:
+        return requirement.lower()
+    name = re.sub(r"[-_.]+", "-", match.group(1)).lower()
+    return name + match.group(2).lower()
+
+
+def requirements_hash(packages: list) -> str:
+    """
+    Stable hash of a requirement set, independent of order, case and duplicates.
+    The interpreter version is part of the key since environments are not portable.
+    """
+    normalized = sorted({normalize_requirement(p) for p in packages if p.strip()})
+    digest = hashlib.sha256()
+    digest.update(f"{sys.implementation.name}-{sys.version_info[0]}.{sys.version_info[1]}".encode())
+    for requirement in normalized:
+        digest.update(b"\n" + requirement.encode("utf-8"))
+    return digest.hexdigest()[:24]
+
+
+def env_python(env_dir: str) -> str:
+    if os.name == "nt":
+        return os.path.join(env_dir, "Scripts", "python.exe")
+    return os.path.join(env_dir, "bin", "python")
+
+
+def env_vars(env_dir: str) -> dict:
+    """
+    Environment variables that make `python` and console scripts resolve to env_dir.
+    """
+    env = dict(os.environ)
+    bin_dir = os.path.dirname(env_python(env_dir))
+    env["VIRTUAL_ENV"] = env_dir
+    env["PATH"] = bin_dir + os.pathsep + env.get("PATH", "")
+    env.pop("PYTHONHOME", None)
+    return env
+
+
+def _env_dir(env_hash: str) -> str:
+    return os.path.join(VENV_POOL_DIR, env_hash)
+
+
+def _is_ready(env_dir: str) -> bool:
+    return os.path.isfile(os.path.join(env_dir, READY_MARKER))
+
+
+@contextmanager
+def _env_lock(env_hash: str, blocking: bool = True):
+    """
+    Lock one pool entry across threads and, where supported, across processes.
+    Yields False instead of waiting when blocking is off and the entry is busy.
+    """
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(env_hash, threading.Lock())
+    if not thread_lock.acquire(blocking):
+        yield False
+        return
+    try:
+        if fcntl is None:
+            yield True
+            return
+        os.makedirs(VENV_POOL_DIR, exist_ok=True)
+        with open(os.path.join(VENV_POOL_DIR, f"{env_hash}.lock"), "w") as lock_file:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock_file, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    finally:
+        thread_lock.release()
+
+
+def _lease_path(env_hash: str) -> str:
+    return os.path.join(VENV_POOL_DIR, f"{env_hash}.lease")
+
+
+@contextmanager
+def _lease(env_hash: str):
+    """
+    Shared hold on one pool entry for as long as it is installed into or
+    used; evict() only removes entries nobody holds a lease on.
+    """
+    if fcntl is None:
+        with _thread_locks_guard:
+            _lease_counts[env_hash] = _lease_counts.get(env_hash, 0) + 1
+        try:
+            yield
+        finally:
+            with _thread_locks_guard:
+                _lease_counts[env_hash] -= 1
+        return
+    os.makedirs(VENV_POOL_DIR, exist_ok=True)
+    with open(_lease_path(env_hash), "a") as lease_file:
+        fcntl.flock(lease_file, fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lease_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _exclusive_lease(env_hash: str):
+    """
+    Yields True while holding the entry's lease exclusively, False if anyone holds a lease on it.
+    """
+    if fcntl is None:
+        with _thread_locks_guard:  # held throughout so no lease starts meanwhile
+            yield not _lease_counts.get(env_hash)
+        return
+    with open(_lease_path(env_hash), "a") as lease_file:
+        try:
+            fcntl.flock(lease_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lease_file, fcntl.LOCK_UN)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _build_env(env_dir: str, packages: list):
+    """
+    Create a fresh virtualenv at env_dir and install packages into it.
+    Returns (success: bool, output: str).
+    """
+    shutil.rmtree(env_dir, ignore_errors=True)  # leftovers of an interrupted build
+    result = subprocess.run(
+        [sys.executable, "-m", "venv", env_dir],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=120
+    )
+    if result.returncode != 0:
+        return False, result.stderr.decode()
+
+    output = ""
+    if packages:
+        success, output = pip_install(packages, python=env_python(env_dir), timeout=600)
+        if not success:
+            shutil.rmtree(env_dir, ignore_errors=True)
+            return False, output
+
+    with open(os.path.join(env_dir, READY_MARKER), "w", encoding="utf-8") as f:
+        json.dump({"packages": packages, "bytes": _dir_size(env_dir), "created": time.time()}, f)
+    return True, output
+
+
+def lookup_env(packages: list):
+    """
+    Returns the ready environment for this requirement set, or None.
+    Marks it as recently used.
+    """
+    env_dir = _env_dir(requirements_hash(packages))
+    if not _is_ready(env_dir):
+        return None
+    os.utime(os.path.join(env_dir, READY_MARKER), None)
+    return env_dir
+
+
+def acquire_env(packages: list):
+    """
+    Returns (success, env_dir, output) for a virtualenv holding exactly these packages.
+    Known requirement sets are reused instantly; new ones are built once and cached.
+    The environment is leased while it is built, so it cannot be evicted half-installed.
+    """
+    env_hash = requirements_hash(packages)
+    env_dir = _env_dir(env_hash)
+
+    with _lease(env_hash):
+        if lookup_env(packages):
+            return True, env_dir, "♻️ Reusing cached environment."
+
+        with _env_lock(env_hash):
+            # Another build may have finished it while we waited for the lock.
+            if lookup_env(packages):
+                return True, env_dir, "♻️ Reusing cached environment."
+            print(f"🧪 Building new environment {env_hash}...")
+            success, output = _build_env(env_dir, packages)
+
+        if success:
+            evict(keep=env_hash)
+            return True, env_dir, output
+    return False, None, output
+
+
+@contextmanager
+def leased_env(packages: list):
+    """
+    Yields lookup_env(packages) while holding a lease on it, so the
+    environment stays on disk for the whole block (e.g. while an app runs in it).
+    """
+    with _lease(requirements_hash(packages)):
+        yield lookup_env(packages)
+
+
+def evict(keep: str = None, max_bytes: int = VENV_POOL_MAX_BYTES):
+    """
+    Delete least recently used environments until the pool fits in max_bytes.
+    Environments that are being built or are leased (in use) are left alone.
+    """
+    if not os.path.isdir(VENV_POOL_DIR):
+        return
+
+    entries = []
+    for entry in os.scandir(VENV_POOL_DIR):
+        marker = os.path.join(entry.path, READY_MARKER)
+        if not entry.is_dir() or not os.path.isfile(marker):
+            continue
+        try:
+            with open(marker, "r", encoding="utf-8") as f:
+                size = json.load(f).get("bytes", 0)
+            last_used = os.path.getmtime(marker)
+        except (OSError, ValueError):
+            continue
+        entries.append((last_used, size, entry.name))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, env_hash in sorted(entries):
+        if total <= max_bytes:
+            break
+        if env_hash == keep:
+            continue
+        with _env_lock(env_hash, blocking=False) as locked, _exclusive_lease(env_hash) as unused:
+            if not locked or not unused:
+                continue
+            stop_server(env_python(_env_dir(env_hash)))
+            shutil.rmtree(_env_dir(env_hash), ignore_errors=True)
+        total -= size
+        print(f"🧹 Evicted cached environment {env_hash}.")
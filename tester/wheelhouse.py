@@ -0,0 +1,111 @@
+# tester/wheelhouse.py
+
+import argparse
+import os
+import subprocess
+import sys
+from config import WHEELHOUSE_DIR, OFFLINE_INSTALL, USE_WHEELHOUSE, POPULAR_PACKAGES
+
+
+def _run_pip(python: str, args: list, cwd: str = None, timeout: int = 600):
+    result = subprocess.run(
+        [python, "-m", "pip"] + args,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=timeout
+    )
+    success = result.returncode == 0
+    return success, result.stdout.decode() if success else result.stderr.decode()
+
+
+def build_wheels(packages: list, python: str = sys.executable, timeout: int = 600):
+    """
+    Resolve packages (and their dependencies) once and store them as wheels.
+    Wheels already in the wheelhouse are not downloaded again.
+    Returns (success: bool, output: str).
+    """
+    os.makedirs(WHEELHOUSE_DIR, exist_ok=True)
+    return _run_pip(
+        python,
+        ["wheel", "--wheel-dir", WHEELHOUSE_DIR, "--find-links", WHEELHOUSE_DIR] + packages,
+        timeout=timeout
+    )
+
+
+def install_offline(packages: list, python: str = sys.executable, cwd: str = None, timeout: int = 120):
+    """
+    Install packages from the wheelhouse only, without touching any index.
+    Returns (success: bool, output: str).
+    """
+    os.makedirs(WHEELHOUSE_DIR, exist_ok=True)
+    return _run_pip(
+        python,
+        ["install", "--no-index", "--find-links", WHEELHOUSE_DIR] + packages,
+        cwd=cwd,
+        timeout=timeout
+    )
+
+
+def pip_install(packages: list, python: str = sys.executable, cwd: str = None, timeout: int = 120):
+    """
+    Install packages through the wheelhouse.
+    Tries an index-free install first; on a miss the missing wheels are built
+    into the wheelhouse and the install is retried offline. With OFFLINE_INSTALL
+    the index is never contacted.
+    Returns (success: bool, output: str).
+    """
+    if not USE_WHEELHOUSE:
+        return _run_pip(python, ["install"] + packages, cwd=cwd, timeout=timeout)
+
+    success, output = install_offline(packages, python=python, cwd=cwd, timeout=timeout)
+    if success or OFFLINE_INSTALL:
+        return success, output
+
+    print("📥 Fetching missing wheels into the local wheelhouse...")
+    success, output = build_wheels(packages, python=python)
+    if not success:
+        return False, output
+    return install_offline(packages, python=python, cwd=cwd, timeout=timeout)
+
+
+def prefetch(packages: list = None, python: str = sys.executable):
+    """
+    Warm the wheelhouse, by default with POPULAR_PACKAGES.
+    Each package is fetched separately so one bad name does not fail the rest.
+    Returns (fetched, failed) lists of package names.
+    """
+    fetched, failed = [], []
+    for package in packages or POPULAR_PACKAGES:
+        success, output = build_wheels([package], python=python)
+        if success:
+            print(f"✅ {package}")
+            fetched.append(package)
+        else:
+            print(f"❌ {package}\n{output}")
+            failed.append(package)
+    return fetched, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local wheelhouse used for offline installs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prefetch_parser = subparsers.add_parser("prefetch", help="Download and build wheels ahead of time.")
+    prefetch_parser.add_argument("packages", nargs="*", help="Packages to fetch (defaults to the popular list).")
+    prefetch_parser.add_argument("-r", "--requirement", help="Also read packages from a requirements file.")
+    prefetch_parser.add_argument("--python", default=sys.executable, help="Interpreter to build wheels for.")
+
+    args = parser.parse_args()
+    if args.command == "prefetch":
+        packages = list(args.packages)
+        if args.requirement:
+            with open(args.requirement, "r") as f:
+                packages += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        print(f"📦 Prefetching into {WHEELHOUSE_DIR}...")
+        _, failed = prefetch(packages or None, python=args.python)
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()